@@ -6,8 +6,17 @@ Adds inspired by Golang channels interface for asyncio tasks.
 :license: MIT, see LICENSE for more details.
 """
 import logging
-from .channel import Channel
+from .channel import Channel, ChannelError
+from .selector import select
+from .metrics import Metrics
+from .durable_log import DurableLog
+from .codecs import Codec, PickleCodec, CompactCodec, RawCodec, CodecRegistry
+from .network import serve_channel, connect_sender, connect_getter
+try:
+    from .shared_memory import SharedMemoryChannel
+except ImportError:  # multiprocessing.shared_memory requires python 3.8+
+    pass
 from .aiterable_deque import AiterableDeque
 from .utils import aenumerate
 
-logging.getLogger(__name__).addHandler(logging.NullHandler())
\ No newline at end of file
+logging.getLogger(__name__).addHandler(logging.NullHandler())
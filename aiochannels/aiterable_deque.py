@@ -1,43 +1,67 @@
 import asyncio
 
-from functools import wraps
+from random import random
 from collections import AsyncIterable, Iterable
 
 
-from .utils import asyncinit, aenumerate
+from .utils import asyncinit
 
+_MAX_LEVEL = 16
+_LEVEL_P = 0.25  # probability of node to have one more level
+_FAR = 1 << 62
 
-@asyncinit
-class AiterableDeque(AsyncIterable):
 
-    def async_task(f):
-        """
-        Task wrapper decorator for public deque methods.
-        Such methods could be called either with or wthout 'await'
-        """
-        def tmp(self, *args, **kwargs):
-            @wraps(f)
-            async def task_wrapper():
-                return await f(self, *args, **kwargs)
+class _Done:
+    __slots__ = ('result',)
+
+    def __init__(self, result=None):
+        self.result = result
+
+    def __await__(self):
+        return self.result
+        yield
 
-            def task_callback(task):
-                if task in self._edit_tasks:
-                    self._edit_tasks.remove(task)
 
-            pending_task = self.loop.create_task(task_wrapper())
-            self._edit_tasks.append(pending_task)
-            pending_task.add_done_callback(task_callback)
-            return pending_task
+class _DoneNone(_Done):
+    __slots__ = ()
 
-        return tmp
+    def __await__(self):
+        return _EXHAUSTED  # finished iterator results in None
+
+
+_EXHAUSTED = iter(())
+_DONE = _DoneNone()
+
+
+@asyncinit
+class AiterableDeque(AsyncIterable):
 
     class Node:
-        __slots__ = ('val', 'prev', 'next')
+        """
+        Indexable skip list node. Level 0 is the plain doubly linked list of `next` and `prev`
+        attributes, `width` is the distance (in level 0 nodes) to `next`. Only nodes with upper levels
+        have `nexts`, `prevs` and `widths` lists of the same links per level (index 0 is not used),
+        so most nodes don't allocate lists. Removed node keeps its links so iterators standing on it
+        can move forward.
+        """
+        __slots__ = ('val', 'next', 'prev', 'width', 'nexts', 'prevs', 'widths', 'removed')
 
-        def __init__(self, val):
+        def __init__(self, val, height=1, prev=None, next=None, width=1):
             self.val = val
-            self.prev = None
-            self.next = None
+            self.prev = prev
+            self.next = next
+            self.width = width
+            if height > 1:
+                self.nexts = [None] * height
+                self.prevs = [None] * height
+                self.widths = [1] * height
+            else:
+                self.nexts = self.prevs = self.widths = None
+            self.removed = False
+
+        @property
+        def height(self):
+            return 1 if self.nexts is None else len(self.nexts)
 
         def __repr__(self):
             nstr = repr(self.val)
@@ -48,140 +72,410 @@ class AiterableDeque(AsyncIterable):
                     nstr = 'Left anchor'
             return f'Node - {nstr}'
 
-    async def __ainit__(self, iterable=None, loop=None):
+    async def __ainit__(self, iterable=None, loop=None, *, indexed=False):
+        """
+        With `indexed=True` deque keeps a hash index of its (hashable) values,
+        so membership checks, `remove` and `count` don't scan the deque.
+        """
         self.loop = loop if loop else asyncio._get_running_loop()
-        self._edit_mutex = asyncio.Lock()
-        self._edit_tasks = []
 
-        self.left_anchor = self.Node(None)
-        self.right_anchor = self.Node(None)
-        self.left_anchor.next = self.right_anchor
-        self.right_anchor.prev = self.left_anchor
-
-        self._nodes = set()
-        self._nodes.add(self.left_anchor)
-        self._nodes.add(self.right_anchor)
+        self.left_anchor = self.Node(None, _MAX_LEVEL)
+        self.right_anchor = self.Node(None, _MAX_LEVEL)
+        self._link_anchors()
+        self._index = {} if indexed else None  # value -> {node: None}
+        self._snapshot = None  # values tuple shared by snapshot readers until next edit
 
         if iterable:
             if not isinstance(iterable, Iterable):
                 raise TypeError('Iterable instance is expected!')
 
-            for el in iterable:
-                await self.append(el)
-
-    def _attach_node(self, prev_node, new_node, next_node):
-        prev_node.next = new_node
-        next_node.prev = new_node
-        new_node.prev = prev_node
-        new_node.next = next_node
-        self._nodes.add(new_node)
-
-    def _detach_node(self, node):
-        node.prev.next = node.next
-        node.next.prev = node.prev
-        self._nodes.remove(node)
-
-    @async_task
-    async def append(self, val):
-        async with self._edit_mutex:
-            self._attach_node(
-                self.right_anchor.prev,
-                self.Node(val),
-                self.right_anchor)
-
-    @async_task
-    async def pop(self):
-        if not len(self):
-            raise IndexError('Pop from empty list!')
+            self.extend(iterable)
+
+    def _link_anchors(self):
+        left_anchor, right_anchor = self.left_anchor, self.right_anchor
+        left_anchor.next, right_anchor.prev = right_anchor, left_anchor
+        left_anchor.nexts = [right_anchor] * _MAX_LEVEL
+        right_anchor.prevs = [left_anchor] * _MAX_LEVEL
+        # Widths of links to the right anchor are not maintained and are kept far beyond any
+        # position, so lookups never step onto the anchor. Level tail positions are kept instead.
+        left_anchor.width = _FAR
+        self._tail_pos = [0] * _MAX_LEVEL
+        self._level = 1  # levels above are not linked and have stale widths
+        self._size = 0
+
+    def _new_node(self, val, height=1):
+        """
+        Draws node height starting from `height` (callers which already drew
+        upper level pass 2), every next level is taken with `_LEVEL_P` probability.
+        """
+        while height < _MAX_LEVEL and random() < _LEVEL_P:
+            height += 1
+        if height > self._level:
+            for level in range(self._level, height):
+                self.left_anchor.widths[level] = _FAR
+                self._tail_pos[level] = 0
+            self._level = height
+        return self.Node(val, height)
+
+    def _append_node(self, node):
+        """
+        O(1) expected. Predecessors of the last position are the right anchor links
+        and their positions are kept in `_tail_pos`.
+        """
+        right_anchor, tail_pos = self.right_anchor, self._tail_pos
+        pos = self._size + 1
+        prev_node = node.prev = right_anchor.prev
+        prev_node.next = right_anchor.prev = node
+        prev_node.width = pos - tail_pos[0]
+        node.next, node.width = right_anchor, _FAR
+        tail_pos[0] = pos
+
+        prevs = right_anchor.prevs
+        for level in range(1, node.height):
+            prev_node = prevs[level]
+            prev_node.nexts[level] = prevs[level] = node
+            prev_node.widths[level] = pos - tail_pos[level]
+            node.nexts[level] = right_anchor
+            node.prevs[level] = prev_node
+            node.widths[level] = _FAR
+            tail_pos[level] = pos
+        self._size = pos
+        self._snapshot = None
+        if self._index is not None:
+            self._index.setdefault(node.val, {})[node] = None
+
+    def _insert_node(self, pos, node):
+        """
+        O(log n) expected. Inserts node at 1-based position, left anchor has position 0.
+        """
+        prev_node, prev_pos = self.left_anchor, 0
+        right_anchor, tail_pos = self.right_anchor, self._tail_pos
+        height = node.height
+        for level in reversed(range(1, self._level)):
+            while prev_pos + prev_node.widths[level] < pos:
+                prev_pos += prev_node.widths[level]
+                prev_node = prev_node.nexts[level]
+
+            next_node = prev_node.nexts[level]
+            if next_node is not right_anchor:
+                tail_pos[level] += 1  # level tail is moved right by the new node
+
+            if level < height:
+                if next_node is right_anchor:
+                    tail_pos[level] = pos
+                width = prev_node.widths[level]
+                node.nexts[level] = next_node
+                node.prevs[level] = prev_node
+                prev_node.nexts[level] = next_node.prevs[level] = node
+                prev_node.widths[level] = pos - prev_pos
+                node.widths[level] = width - (pos - prev_pos) + 1
+            else:
+                prev_node.widths[level] += 1
+
+        while prev_pos + prev_node.width < pos:
+            prev_pos += prev_node.width
+            prev_node = prev_node.next
+        next_node = prev_node.next
+        tail_pos[0] = pos if next_node is right_anchor else tail_pos[0] + 1
+        width = prev_node.width
+        node.next, node.prev = next_node, prev_node
+        prev_node.next = next_node.prev = node
+        prev_node.width = pos - prev_pos
+        node.width = width - (pos - prev_pos) + 1
+        self._size += 1
+        self._snapshot = None
+        if self._index is not None:
+            self._index.setdefault(node.val, {})[node] = None
+
+    def _detach_node(self, node, last=False):
+        """
+        O(log n) expected, O(1) for the last node. Nodes covering removed one on upper levels
+        are found by walking left from its own predecessors, so position of the node is not needed.
+        """
+        right_anchor, tail_pos = self.right_anchor, self._tail_pos
+        prev_node, next_node = node.prev, node.next
+        if next_node is right_anchor:
+            tail_pos[0] -= prev_node.width  # predecessor becomes the tail
+        else:
+            tail_pos[0] -= 1
+        prev_node.next = next_node
+        next_node.prev = prev_node
+        prev_node.width += node.width - 1
+
+        height = node.height
+        for level in range(1, height):
+            prev_node, next_node = node.prevs[level], node.nexts[level]
+            if next_node is right_anchor:
+                tail_pos[level] -= prev_node.widths[level]  # predecessor becomes level tail
+            else:
+                tail_pos[level] -= 1
+            prev_node.nexts[level] = next_node
+            next_node.prevs[level] = prev_node
+            prev_node.widths[level] += node.widths[level] - 1
+
+        if not last:  # upper levels of the last node only link level tails to the right anchor
+            cover = node.prevs[height - 1] if height > 1 else node.prev
+            for level in range(height, self._level):
+                while cover.height <= level:
+                    cover = cover.prevs[level - 1] if level > 1 else cover.prev
+                if cover.nexts[level] is not right_anchor:
+                    cover.widths[level] -= 1
+                    tail_pos[level] -= 1
+
+        node.removed = True
+        self._size -= 1
+        self._snapshot = None
+        if self._index is not None:
+            self._unindex(node)
+
+    def _unindex(self, node):
+        nodes = self._index[node.val]
+        del nodes[node]
+        if not nodes:
+            del self._index[node.val]
+
+    def _position(self, node):
+        """
+        O(log n) expected. Returns 1-based position of attached node climbing up to the left anchor.
+        """
+        pos = 0
+        while node is not self.left_anchor:
+            if node.nexts is None:
+                node = node.prev
+                pos += node.width
+            else:
+                level = len(node.nexts) - 1
+                node = node.prevs[level]
+                pos += node.widths[level]
+        return pos
+
+    def _find_nodes(self, expected_val):
+        """
+        Returns nodes with expected value in deque order.
+        """
+        if self._index is None:
+            return [node for node in self._iter_nodes() if node.val == expected_val]
 
-        async with self._edit_mutex:
-            node = self.right_anchor.prev
-            self._detach_node(node)
-            return node.val
+        nodes = self._index.get(expected_val, ())
+        return sorted(nodes, key=self._position) if len(nodes) > 1 else list(nodes)
 
-    @async_task
-    async def popleft(self):
-        if not len(self):
+    def _node_at(self, ix):
+        """
+        O(log n) expected lookup by index.
+        """
+        if ix < 0:
+            ix += self._size
+        if not 0 <= ix < self._size:
+            raise IndexError('Index out of range!')
+
+        node, node_pos = self.left_anchor, 0
+        for level in reversed(range(1, self._level)):
+            while node_pos + node.widths[level] <= ix + 1:
+                node_pos += node.widths[level]
+                node = node.nexts[level]
+        while node_pos + node.width <= ix + 1:
+            node_pos += node.width
+            node = node.next
+        return node
+
+    # Public edit methods are applied right away and return already completed awaitable,
+    # so they could be called either with or wthout 'await'.
+
+    def append(self, val):
+        """
+        O(1) expected, node without upper levels (3 of 4 nodes) is linked right here.
+        """
+        if random() < _LEVEL_P:
+            self._append_node(self._new_node(val, 2))
+            return _DONE
+
+        right_anchor, tail_pos = self.right_anchor, self._tail_pos
+        prev_node = right_anchor.prev
+        node = prev_node.next = right_anchor.prev = self.Node(val, 1, prev_node, right_anchor, _FAR)
+        pos = self._size + 1
+        prev_node.width = pos - tail_pos[0]
+        tail_pos[0] = self._size = pos
+        self._snapshot = None
+        if self._index is not None:
+            self._index.setdefault(val, {})[node] = None
+        return _DONE
+
+    def pop(self):
+        if not self._size:
             raise IndexError('Pop from empty list!')
 
-        async with self._edit_mutex:
-            node = self.left_anchor.next
+        node = self.right_anchor.prev
+        if node.nexts is not None:
+            self._detach_node(node, last=True)
+            return _Done(node.val)
+
+        # last node without upper levels, only level 0 tail is changed
+        prev_node = node.prev
+        prev_node.next, self.right_anchor.prev = self.right_anchor, prev_node
+        self._tail_pos[0] -= prev_node.width
+        prev_node.width = _FAR
+        node.removed = True
+        self._size -= 1
+        self._snapshot = None
+        if self._index is not None:
+            self._unindex(node)
+        return _Done(node.val)
+
+    def popleft(self):
+        if not self._size:
+            raise IndexError('Pop from empty list!')
+
+        node = self.left_anchor.next
+        self._detach_node(node)
+        return _Done(node.val)
+
+    def appendleft(self, val):
+        self._insert_node(1, self._new_node(val))
+        return _DONE
+
+    def extend(self, iterable):
+        """
+        Appends all values at once, O(1) expected per value.
+        """
+        append = self.append
+        for val in iterable:
+            append(val)
+        return _DONE
+
+    def extendleft(self, iterable):
+        """
+        Prepends values one by one like `deque.extendleft` does, so their order is reversed.
+        """
+        insert_node, new_node = self._insert_node, self._new_node
+        for val in iterable:
+            insert_node(1, new_node(val))
+        return _DONE
+
+    def clear(self):
+        """
+        Removes all values. Iterators standing on removed nodes are moved to the end.
+        """
+        right_anchor = self.right_anchor
+        node = self.left_anchor.next
+        while node is not right_anchor:
+            node.removed = True
+            node.next, node = right_anchor, node.next
+
+        self._link_anchors()
+        self._snapshot = None
+        if self._index is not None:
+            self._index = {}
+        return _DONE
+
+    def insert(self, ix, val):
+        if ix == len(self):
+            self.append(val)
+        else:
+            pos = self._size + ix + 1 if ix < 0 else ix + 1
+            self._node_at(ix)  # checks index range
+            self._insert_node(pos, self._new_node(val))
+        return _DONE
+
+    def remove(self, expected_val):
+        """
+        Removes first occurrence of value, does nothing if there is no such value.
+        """
+        if self._index is not None:
+            nodes = self._index.get(expected_val, ())
+            if nodes:
+                self._detach_node(min(nodes, key=self._position) if len(nodes) > 1 else next(iter(nodes)))
+            return _DONE
+
+        for node in self._iter_nodes():
+            if node.val == expected_val:
+                self._detach_node(node)
+                break
+        return _DONE
+
+    def remove_all(self, expected_val):
+        """
+        Removes all occurrences of value and returns their count.
+        """
+        nodes = self._find_nodes(expected_val)
+        for node in nodes:
             self._detach_node(node)
-            return node.val
-
-    @async_task
-    async def appendleft(self, val):
-        async with self._edit_mutex:
-            self._attach_node(
-                self.left_anchor,
-                self.Node(val),
-                self.left_anchor.next)
-
-    @async_task
-    async def insert(self, ix, val):
-        prev_node = (await self.__getitem__(ix, invoker_task='insert')).prev
-        async with self._edit_mutex:
-            new_node = self.Node(val)
-            next_node = prev_node.next
-            self._attach_node(prev_node, new_node, next_node)
-
-    @async_task
-    async def remove(self, expected_val):
-        async with self._edit_mutex:
-            for node in self._nodes:
-                if node.val == expected_val:
-                    self._detach_node(node)
-                    break
-
-    @async_task
-    async def flattern(self):
-        q_list = []
-        async for node in self._walk_nodes(invoker_task='flattern'):
-            q_list.append(node.val)
-
-        return q_list
-
-    async def _walk_nodes(self, invoker_task=''):
+        return _Done(len(nodes))
+
+    def count(self, expected_val):
+        if self._index is not None:
+            return len(self._index.get(expected_val, ()))
+        return sum(1 for node in self._iter_nodes() if node.val == expected_val)
+
+    def flattern(self):
+        return _Done(list(self._iter_nowait()))
+
+    async def _walk_nodes(self, chunk_size=1, interval=None):
+        time = self.loop.time
+        deadline = None if interval is None else time() + interval
+        walked = 0
+
         node = self.left_anchor.next
         while node is not self.right_anchor:
-            while self._edit_tasks:
-                task = self._edit_tasks.pop()
-                if not task.done() and not task._coro.__name__ == invoker_task:  # preventing self-invoke
-                    await task
-
-            async with self._edit_mutex:  # in case edit tasks from another thread
-                while node not in self._nodes:
-                    node = node.next
-                    if node is self.right_anchor:
-                        return
+            # node could be removed while iterator was suspended, removed nodes keep their links
+            while node.removed:
+                node = node.next
+                if node is self.right_anchor:
+                    return
 
             yield node
             node = node.next
-            await asyncio.sleep(0)
+            walked += 1
+            if walked == chunk_size or deadline is not None and time() >= deadline:
+                await asyncio.sleep(0)
+                walked = 0
+                deadline = None if interval is None else time() + interval
 
-    def __len__(self):
-        return len(self._nodes) - 2
+    def _iter_nodes(self):
+        node = self.left_anchor.next
+        while node is not self.right_anchor:
+            if not node.removed:
+                yield node
+            node = node.next
 
-    def __getitem__(self, expected_ix, invoker_task=''):
-        if isinstance(expected_ix, slice):
-            raise TypeError('Slices are not supported!')
+    def _iter_nowait(self):
+        """
+        Walks over current values without yielding to the loop.
+        """
+        for node in self._iter_nodes():
+            yield node.val
 
-        if expected_ix < 0:
-            expected_ix = len(self) + expected_ix
+    def snapshot(self):
+        """
+        Returns tuple of current values. It's copied only once after an edit,
+        so iterating it is consistent and doesn't need to await anything.
+        """
+        if self._snapshot is None:
+            self._snapshot = tuple(self._iter_nowait())
+        return self._snapshot
+
+    async def chunked(self, chunk_size=64, interval=None):
+        """
+        Async iteration which yields control to the loop every `chunk_size` values
+        or every `interval` seconds (pass `chunk_size=None` to use interval only).
+        Deque can be edited while iterating like with `async for value in dq`.
+        """
+        async for node in self._walk_nodes(chunk_size, interval):
+            yield node.val
 
-        async def task_wrapper():
-            # when edit queue while iterating you can get new value at the same ix
-            async for ix, node in aenumerate(self._walk_nodes(invoker_task)):
-                if expected_ix > len(self) - 1 or expected_ix < 0:
-                    raise IndexError('Index out of range!')
+    def __len__(self):
+        return self._size
 
-                if ix == expected_ix:
-                    return node.val if not invoker_task else node
+    def __getitem__(self, expected_ix):
+        if isinstance(expected_ix, slice):
+            raise TypeError('Slices are not supported!')
 
-        return self.loop.create_task(task_wrapper())
+        return _Done(self._node_at(expected_ix).val)
 
     def __contains__(self, expected_val):
-        for node in self._nodes:
+        if self._index is not None:
+            return expected_val in self._index
+
+        for node in self._iter_nodes():
             if node.val == expected_val:
                 return True
         else:
@@ -1,10 +1,17 @@
 import asyncio
 import weakref
+import functools
 import logging
+import threading
 
+from heapq import heapify, heappop, heapreplace
+from itertools import islice
 from collections import deque, AsyncIterable
 
 from .aiterable_deque import AiterableDeque
+from .ring_buffer import RingBuffer
+from .conflated_queue import ConflatedQueue
+from .scheduler import SenderScheduler
 from .utils import asyncinit, asynclshift
 
 log = logging.getLogger(__name__)
@@ -14,25 +21,265 @@ class ChannelError(Exception):
     pass
 
 
+_EMPTY = object()
+_SILENT_BATCH = 256  # silent getter receives no more data at once
+_REPLAY_BATCH = 256  # data read from log at once by getter with unlimited buffer
+
+# What getter does when channel has more data than getter's buffer can fit
+OVERFLOW_POLICIES = (
+    'block',  # channel waits until getter receives buffered data (default)
+    'drop_oldest',  # oldest buffered data is dropped
+    'drop_newest',  # data which doesn't fit is dropped
+    'detach',  # data which doesn't fit is dropped and getter is detached
+)
+
+MODES = (
+    'broadcast',  # every getter receives all data into its own buffer (default)
+    'ring',  # every getter receives all data from one buffer shared by getters
+    'balance',  # every message is received by one getter which has free buffer space
+    'conflate',  # every getter keeps only the latest data per key and never blocks channel
+)
+
+# How 'balance' channel chooses getter for the next message
+STRATEGIES = ('round_robin', 'least_loaded')
+
+
+def _wakeup_next(waiters):
+    """
+    Wakes up the first waiter which isn't cancelled (same as asyncio.Queue does).
+    """
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            break
+
+
+def _wakeup_all(waiters):
+    while waiters:
+        _wakeup_next(waiters)
+
+
+def _release_waiter(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _as_predicate(func):
+    return lambda data: bool(func(data))
+
+
+def _report_error(loop, message, e):
+    """
+    Passes errors of user code (callbacks, keys, stage functions) to loop exception handler
+    instead of stopping the channel, data they failed on is skipped.
+    """
+    loop.call_exception_handler({'message': message, 'exception': e})
+
+
+class _SharedWaiter(asyncio.Future):
+    """
+    Waiter registered in several endpoints at once (by `select`). Detach of one endpoint
+    fails it with ChannelError instead of cancelling, so waiting task isn't seen as cancelled.
+    """
+
+
+def _cancel_all(waiters, endpoint=None):
+    while waiters:
+        waiter = waiters.popleft()
+        if waiter.done():
+            continue
+        if isinstance(waiter, _SharedWaiter):
+            waiter.set_exception(ChannelError(f'{endpoint!r} is detached!'))
+        else:
+            waiter.cancel()
+
+
+def _fail_all(waiters, message):
+    """
+    Wakes up all waiters with ChannelError, unlike cancellation it can't be confused
+    with cancellation of waiting task.
+    """
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_exception(ChannelError(message))
+
+
+class _Callback:
+    """
+    Runs getter callback for received data.
+    """
+    __slots__ = ('cb', 'loop', 'max_concurrency', 'executor', 'batch',
+                 '_is_async', '_running', '_pending', '_collected', '_ready_waiter')
+
+    def __init__(self, cb, loop, max_concurrency=None, executor=None, batch=False):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError('max_concurrency should be positive!')
+        if executor is not None and asyncio.iscoroutinefunction(cb):
+            raise ValueError('Async callback can not be run in executor!')
+
+        self.cb = cb
+        self.loop = loop
+        self.max_concurrency = max_concurrency
+        self.executor = executor
+        self.batch = batch
+        self._is_async = asyncio.iscoroutinefunction(cb)
+        self._running = 0
+        self._pending = deque()  # data waiting for max_concurrency
+        self._collected = None  # batch of data for the next call
+        self._ready_waiter = None
+
+    def __call__(self, data):
+        if not self.batch:
+            self._dispatch(data)
+        elif self._collected is None:
+            self._collected = [data]
+            self.loop.call_soon(self._flush)
+        else:
+            self._collected.append(data)
+
+    def _flush(self):
+        batch, self._collected = self._collected, None
+        self._dispatch(batch)
+
+    def _dispatch(self, arg):
+        if not self._is_async and self.executor is None:
+            try:
+                self.cb(arg)
+            except Exception as e:  # callback errors shouldn't break `get`
+                _report_error(self.loop, f'Exception in getter callback {self.cb!r}', e)
+        elif self.max_concurrency is not None and self._running >= self.max_concurrency:
+            self._pending.append(arg)
+        else:
+            self._start(arg)
+
+    def _start(self, arg):
+        self._running += 1
+        if self._is_async:
+            future = self.loop.create_task(self.cb(arg))
+        else:
+            future = self.loop.run_in_executor(self.executor, self.cb, arg)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._running -= 1
+        if not future.cancelled() and future.exception() is not None:
+            _report_error(self.loop, f'Exception in getter callback {self.cb!r}', future.exception())
+
+        if self._pending:
+            self._start(self._pending.popleft())
+        elif self._ready_waiter is not None:
+            _release_waiter(self._ready_waiter)
+
+    async def wait_ready(self):
+        """
+        Waits until callback has no data waiting for max_concurrency.
+        """
+        while self._pending:
+            self._ready_waiter = self.loop.create_future()
+            try:
+                await self._ready_waiter
+            finally:
+                self._ready_waiter = None
+
+
 @asyncinit
 class Channel(AsyncIterable):
 
     @asynclshift
     class Sender:
-        __slots__ = ('channel', '_send_queue', '_pending_channel_task', '_pending_self_task')
+        __slots__ = ('channel', '_send_queue', '_maxsize', '_putters', '_attached', '_ready',
+                     'priority', 'weight', '_taken', '_charged', '_vstart')
+
+        def __init__(self, channel, bs, priority=0, weight=1):
+            if weight <= 0:
+                raise ValueError('Sender weight should be positive!')
 
-        def __init__(self, channel, bs):
             self.channel = channel
-            self._send_queue = asyncio.Queue(maxsize=bs)
-            self._pending_channel_task = None
-            self._pending_self_task = None
+            self._send_queue = deque()
+            self._maxsize = bs
+            self._putters = deque()
+            self._attached = False
+            self._ready = False  # sender is in channel's ready senders queue
+            self.priority = priority
+            self.weight = weight
+            self._taken = 0  # messages taken by channel loop
+            self._charged = 0  # taken messages already accounted by scheduler
+            self._vstart = 0.0  # scheduler virtual time
+
+        def _mark_ready(self):
+            if self._attached and not self._ready:
+                self._ready = True
+                self.channel._ready_senders.append(self)
+                self.channel._wakeup()
+
+        def _full(self):
+            return 0 < self._maxsize <= len(self._send_queue)
+
+        def _free_space(self):
+            if self._maxsize <= 0:
+                return None
+            return self._maxsize - len(self._send_queue)
+
+        async def _wait_for_space(self):
+            while self._full():
+                putter = self.channel.loop.create_future()
+                self._putters.append(putter)
+                try:
+                    await putter
+                except asyncio.CancelledError:
+                    putter.cancel()  # send itself could be cancelled
+                    try:
+                        self._putters.remove(putter)
+                    except ValueError:
+                        pass
+                    if not self._full() and not putter.cancelled():
+                        _wakeup_next(self._putters)
+                    raise
+
+        def _send_nowait(self, data):
+            self._send_queue.append(data)
+            self._mark_ready()
 
         async def send(self, data):
-            self._pending_self_task = self.channel.loop.create_task(self._send_queue.put(data))
-            await self._pending_self_task
+            await self._wait_for_space()
+            self._send_nowait(data)
+            self.channel._raise_if_stopped()
+
+        async def send_many(self, iterable):
+            """
+            Sends all items from iterable keeping their order.
+            Items are put into sender buffer in chunks as big as free space allows,
+            so channel loop takes them with one pass instead of one pass per item.
+            """
+            items = iter(iterable)
+            pending = next(items, _EMPTY)
+            while pending is not _EMPTY:
+                await self._wait_for_space()
+                free = self._free_space()
+                self._send_queue.append(pending)
+                if free is None:
+                    self._send_queue.extend(items)
+                else:
+                    self._send_queue.extend(islice(items, free - 1))
+                pending = next(items, _EMPTY)
+                self._mark_ready()
 
-            if self.channel._run_channel_task.done():
-                raise ChannelError('Channe loop stopped with error!') from self.channel._loop_task_exception
+            self.channel._raise_if_stopped()
+
+        def _take(self, max_items=None):
+            queue = self._send_queue
+            if max_items is None or max_items >= len(queue):
+                batch = list(queue)
+                queue.clear()
+            else:
+                batch = [queue.popleft() for _ in range(max_items)]
+
+            self._taken += len(batch)
+            for _ in range(min(len(batch), len(self._putters))):
+                _wakeup_next(self._putters)
+            return batch
 
         @property
         def is_attached(self):
@@ -40,97 +287,480 @@ class Channel(AsyncIterable):
 
         async def detach(self):
             if self.is_attached:
-                if self._pending_self_task and not self._pending_self_task.done():
-                    self._pending_self_task.cancel()
-
-                if self._pending_channel_task and not self._pending_channel_task.done():
-                    self._pending_channel_task.cancel()
-
+                _cancel_all(self._putters, self)
+                self._attached = False
+                if self._ready:
+                    self._ready = False
+                    try:
+                        self.channel._ready_senders.remove(self)
+                    except ValueError:  # channel loop is handling this sender now
+                        pass
                 await self.channel._senders.remove(self)
 
+        def stats(self):
+            return {'queue_depth': len(self._send_queue)}
+
         async def attach(self):
             if not self.is_attached:
                 await self.channel._senders.append(self)
+                self._attached = True
+                if self._send_queue:
+                    self._mark_ready()
 
         async def __alshift__(self, data):
             await self.send(data)
 
+    class ThreadsafeSender:
+        """
+        Sender for producers running outside of event loop thread.
+        Data is buffered under a lock and handed over to the loop in batches,
+        so there is one loop wakeup per batch instead of one per message.
+        """
+        __slots__ = ('sender', '_pending', '_cond', '_flush_scheduled', '_loop_thread')
+
+        def __init__(self, sender):
+            self.sender = sender
+            self._pending = deque()
+            self._cond = threading.Condition()
+            self._flush_scheduled = False
+            self._loop_thread = threading.get_ident()
+
+        @property
+        def channel(self):
+            return self.sender.channel
+
+        @property
+        def is_attached(self):
+            return self.sender._attached
+
+        def _full(self):
+            # data moved into sender buffer is in flight too
+            sender = self.sender
+            return 0 < sender._maxsize <= len(self._pending) + len(sender._send_queue)
+
+        def _can_put(self):
+            return not self._full() or not self.sender._attached
+
+        def _check_thread(self):
+            if threading.get_ident() == self._loop_thread:
+                raise RuntimeError('Blocking send from event loop thread, use Sender instead!')
+
+        def _schedule_flush(self):
+            # should be called with acquired lock
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                self.channel.loop.call_soon_threadsafe(self._flush)
+
+        def _flush(self, _=None):
+            # called in event loop thread, moves pending data into sender buffer
+            sender = self.sender
+            with self._cond:
+                self._flush_scheduled = False
+                if not sender._attached:
+                    self._cond.notify_all()  # blocked threads should raise
+                    return
+
+                free = sender._free_space()
+                count = len(self._pending) if free is None else min(free, len(self._pending))
+                sender._send_queue.extend(self._pending.popleft() for _ in range(count))
+                if not self._full():
+                    self._cond.notify_all()
+
+                if self._pending or self._full():  # flush again when channel takes data from sender
+                    self._flush_scheduled = True
+                    waiter = self.channel.loop.create_future()
+                    waiter.add_done_callback(self._flush)
+                    sender._putters.append(waiter)
+
+            if count:
+                sender._mark_ready()
+
+        def try_send(self, data):
+            """
+            Returns False if data can't be sent without blocking.
+            """
+            with self._cond:
+                if not self.sender._attached:
+                    raise ChannelError('Sender is detached!')
+                if self._full():
+                    return False
+
+                self._pending.append(data)
+                self._schedule_flush()
+                return True
+
+        def send(self, data):
+            self._check_thread()
+            with self._cond:
+                self._cond.wait_for(self._can_put)
+                if not self.sender._attached:
+                    raise ChannelError('Sender is detached!')
+
+                self._pending.append(data)
+                self._schedule_flush()
+
+        def send_many(self, iterable):
+            self._check_thread()
+            items = iter(iterable)
+            pending = next(items, _EMPTY)
+            while pending is not _EMPTY:
+                with self._cond:
+                    self._cond.wait_for(self._can_put)
+                    if not self.sender._attached:
+                        raise ChannelError('Sender is detached!')
+
+                    self._pending.append(pending)
+                    if self.sender._maxsize <= 0:
+                        self._pending.extend(items)
+                    else:
+                        self._pending.extend(islice(items, self.sender._maxsize - len(self._pending)))
+                    self._schedule_flush()
+                pending = next(items, _EMPTY)
+
+        async def detach(self):
+            await self.sender.detach()
+            with self._cond:
+                self._cond.notify_all()
+
+        async def attach(self):
+            await self.sender.attach()
+            with self._cond:
+                if self._pending:
+                    self._schedule_flush()
+
     class Getter(AsyncIterable):
-        __slots__ = ('channel', '_received_queue', '_pending_channel_task',
-                     '_pending_self_task', '_callbacks', '_silent_task')
+        __slots__ = ('channel', '_received_queue', '_maxsize', '_waiters',
+                     '_callbacks', '_silent_task', 'overflow', '_dropped', 'topics', 'key', '_replay')
+
+        def __init__(self, channel, bs, silent, overflow='block', topics=None, key=None, offset=None):
+            if overflow not in OVERFLOW_POLICIES:
+                raise ValueError(f'Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}')
 
-        def __init__(self, channel, bs, silent):
             self.channel = channel
-            self._received_queue = asyncio.Queue(maxsize=bs)
+            self.topics = self.key = None  # getter receives everything without topics
+            if topics is not None or key is not None:
+                if channel.mode not in ('broadcast', 'conflate'):
+                    raise ValueError(f'Topics are not supported by {channel.mode} channel!')
+                if topics is None:  # key is a predicate
+                    topics, key = (True,), _as_predicate(key)
+                key = key or channel.key
+                if key is None:
+                    raise ValueError('Topics require getter or channel key!')
+                self.topics, self.key = frozenset(topics), key
+            self._replay = None  # log offset of the next replayed data
+            if offset is not None:
+                if channel._log is None or channel.mode not in ('broadcast', 'conflate'):
+                    raise ValueError('Offset requires broadcast or conflate channel with log!')
+                self._replay = max(offset, channel._log.start_offset)
+            if channel._ring is not None:
+                if overflow not in ('block', 'drop_oldest'):
+                    raise ValueError(f'Overflow policy {overflow!r} is not supported by ring channel!')
+                self._received_queue = channel._ring.reader(blocking=overflow == 'block')
+            elif channel.mode in ('balance', 'conflate') and overflow != 'block':
+                raise ValueError(f'Overflow policy {overflow!r} is not supported by {channel.mode} channel!')
+            elif channel.mode == 'conflate':
+                self._received_queue = ConflatedQueue(channel.key, functools.partial(
+                    _report_error, channel.loop, f'Exception in conflate key {channel.key!r}, value is dropped'))
+                bs = 0  # stale data is replaced so getter buffer has no limit
+            else:
+                self._received_queue = deque()
+            self._maxsize = bs
+            self._waiters = deque()
+            self.overflow = overflow
+            self._dropped = 0
             self._callbacks = []
-            self._pending_channel_task = None
-            self._pending_self_task = None
             self._silent_task = channel.loop.create_task(self._get_silently()) if silent else None
 
+        def _full(self):
+            return 0 < self._maxsize <= len(self._received_queue)
+
+        def _free_space(self):
+            if self._maxsize <= 0:
+                return None
+            # queue can exceed the limit when cancelled `get_batch` returns collected data
+            return max(0, self._maxsize - len(self._received_queue))
+
+        def _put(self, batch):
+            """
+            Returns False if getter should be detached because of overflow.
+            """
+            queue = self._received_queue
+            free = self._free_space()
+            overflow = 0 if free is None else len(batch) - free
+            if overflow <= 0 or self.overflow == 'block':
+                queue.extend(batch)
+            elif self.overflow == 'drop_oldest':
+                queue.extend(batch)
+                for _ in range(overflow):
+                    queue.popleft()
+            else:  # drop_newest or detach
+                queue.extend(islice(batch, free))
+
+            if overflow > 0 and self.overflow != 'block':
+                self._dropped += overflow
+
+            for _ in range(min(len(queue), len(self._waiters))):
+                _wakeup_next(self._waiters)
+
+            return overflow <= 0 or self.overflow != 'detach'
+
         async def _get_silently(self):
             await asyncio.sleep(0)  # let getter to finish init and attach
             while self.is_attached:
-                await self.get()
+                for cb in self._callbacks:
+                    await cb.wait_ready()
+                await self.get_many(_SILENT_BATCH)
+
+        def _demand(self):
+            """
+            Lets channel loop know that getter awaits data.
+            """
+            if self._replay is not None:
+                self._replay_log()
+            self.channel._getters_awaiting.set()
+            self.channel._wakeup()
+
+        def _replay_log(self):
+            """
+            Moves logged data into getter buffer. Getter is attached to channel after it has read
+            the whole log, logging and delivery to attached getters happen without switching tasks
+            in between, so no data is missed or received twice.
+            """
+            log = self.channel._log
+            while self._replay is not None:
+                free = self._free_space()
+                if free == 0:
+                    return
+
+                batch = log.read(self._replay, _REPLAY_BATCH if free is None else free)
+                if not batch:
+                    self._replay = None
+                    self.channel._getters.append(self)
+                    self.channel._wakeup()
+                    return
+
+                self._replay += len(batch)
+                if self.topics is not None:
+                    batch = [data for data in batch if self._subscribed(data)]
+                if batch:
+                    self._put(batch)
+                    return
+
+        def _subscribed(self, data):
+            try:
+                return self.key(data) in self.topics
+            except Exception as e:
+                _report_error(self.channel.loop, f'Exception in channel key {self.key!r}, message is skipped', e)
+                return False
+
+        def _add_waiter(self, waiter):
+            self._waiters.append(waiter)
+            if self.channel._ring is not None:
+                self.channel._waiting_getters.add(self)
+
+        async def _wait_for_data(self, timeout=None):
+            """
+            Returns False if no data was received before timeout.
+            """
+            self._demand()
+            loop = self.channel.loop
+            deadline = None if timeout is None else loop.time() + timeout
+
+            while not self._received_queue:
+                if deadline is not None and loop.time() >= deadline:
+                    return False
+
+                waiter = loop.create_future()
+                timer = None if deadline is None else loop.call_at(deadline, _release_waiter, waiter)
+                try:
+                    await self._wait(waiter)
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+
+            return True
+
+        async def _wait(self, waiter):
+            self._add_waiter(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                waiter.cancel()  # get itself could be cancelled
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                if self._received_queue and not waiter.cancelled():
+                    _wakeup_next(self._waiters)
+                raise
 
         async def get_forever(self):
             while self.is_attached:
                 yield await self.get()
 
+        def _pop_many(self, max_items):
+            queue = self._received_queue
+            if isinstance(queue, RingBuffer.Reader):
+                batch = queue.pop_many(max_items)
+            else:
+                batch = [queue.popleft() for _ in range(min(max_items, len(queue)))]
+            self.channel._wakeup()  # buffer has free space again
+            return batch
+
+        def _get_nowait(self):
+            data = self._received_queue.popleft()
+            self.channel._wakeup()  # buffer has free space again
+            self._run_callbacks(data)
+            return data
+
         async def get(self):
-            self.channel._getters_awaiting.set()
-            self._pending_self_task = self.channel.loop.create_task(self._received_queue.get())
-            for cb in self._callbacks:
-                self._pending_self_task.add_done_callback(cb)
-            
-            data = await self._pending_self_task
-            self._received_queue.task_done()
+            await self._wait_for_data()
+            data = self._get_nowait()
+            self.channel._raise_if_stopped()
+            return data
 
-            if self.channel._run_channel_task.done():
-                raise ChannelError('Channe loop stopped with error!') from self.channel._loop_task_exception
-            else:
-                return data
+        async def get_many(self, max_items, timeout=None):
+            """
+            Waits for data (no longer than timeout if passed) and returns a list
+            of up to max_items already received items. Empty list means timeout.
+            """
+            if max_items < 1:
+                raise ValueError('max_items should be positive!')
+
+            if not await self._wait_for_data(timeout):
+                return []
+
+            batch = self._pop_many(max_items)
+            if self._callbacks:
+                for data in batch:
+                    self._run_callbacks(data)
+
+            self.channel._raise_if_stopped()
+            return batch
+
+        async def get_batch(self, max_items, max_wait):
+            """
+            Waits for data and returns a list of up to max_items items. Batch is returned
+            when it has max_items items or max_wait seconds after its first item was received.
+            """
+            if max_items < 1:
+                raise ValueError('max_items should be positive!')
+
+            await self._wait_for_data()
+            batch = []
+            if max_wait > 0 and len(self._received_queue) < max_items:
+                batch = await self._collect(max_items, max_wait)
+            batch.extend(self._pop_many(max_items - len(batch)))
+            if self._callbacks:
+                for data in batch:
+                    self._run_callbacks(data)
+
+            self.channel._raise_if_stopped()
+            return batch
+
+        async def _collect(self, max_items, max_wait):
+            """
+            Waits until getter has max_items items or max_wait is expired. Items which don't fit
+            into getter buffer are moved into returned list so channel could deliver more.
+            """
+            loop = self.channel.loop
+            queue = self._received_queue
+            waiter = None
+            expired = False
+
+            def expire():
+                nonlocal expired
+                expired = True
+                if waiter is not None:
+                    _release_waiter(waiter)
+
+            # one timer for the whole batch, it releases whichever waiter is current
+            timer = loop.call_later(max_wait, expire)
+            batch = []
+            try:
+                while not expired and len(batch) + len(queue) < max_items:
+                    if self._full():
+                        if isinstance(queue, RingBuffer.Reader):
+                            break  # ring cursor can't be moved back if get_batch is cancelled
+                        batch.extend(self._pop_many(len(queue)))
+
+                    self._demand()
+                    waiter = loop.create_future()
+                    await self._wait(waiter)
+                    waiter = None
+            except asyncio.CancelledError:
+                queue.extendleft(reversed(batch))  # collected data isn't lost
+                raise
+            finally:
+                timer.cancel()
+
+            return batch
+
+        async def batches(self, max_items, max_wait):
+            """
+            Async generator of `get_batch` results.
+            """
+            while self.is_attached:
+                yield await self.get_batch(max_items, max_wait)
 
         @property
         def is_attached(self):
-            return self in self.channel._getters
+            return self._replay is not None or self in self.channel._getters
+
+        @property
+        def dropped(self):
+            """
+            Messages lost because of overflow policy (or replaced by newer ones in conflate channel).
+            """
+            if isinstance(self._received_queue, (RingBuffer.Reader, ConflatedQueue)):
+                return self._received_queue.dropped
+            return self._dropped
+
+        def stats(self):
+            return {'queue_depth': len(self._received_queue), 'dropped': self.dropped}
 
         async def attach(self):
             if not self.is_attached:
+                ring = self.channel._ring
+                if ring is not None:  # getter receives only data sent after attach
+                    dropped = self._received_queue.dropped
+                    self._received_queue = ring.reader(blocking=self.overflow == 'block')
+                    self._received_queue.dropped = dropped
                 await self.channel._getters.append(self)
+                self.channel._wakeup()  # channel loop could wait for getters with free space
                 if self._silent_task:
                     self._silent_task = self.channel.loop.create_task(self._get_silently())
 
         async def detach(self):
             if self.is_attached:
-                if self._pending_self_task and not self._pending_self_task.done():
-                    self._pending_self_task.cancel()
-
-                if self._pending_channel_task and not self._pending_channel_task.done():
-                    self._pending_channel_task.cancel()
+                _cancel_all(self._waiters, self)
 
                 if self._silent_task:
                     self._silent_task.cancel()
 
-                await self.channel._getters.remove(self)
+                if self._replay is not None:  # getter isn't in channel getters until it reads the log
+                    self._replay = None
+                    return
 
-        def add_callback(self, callback):
-            def get_wrapper(cb):
-                def wrapper(task):
-                    try:
-                        res = task.result()
-                        if asyncio.iscoroutinefunction(cb):
-                            self.channel.loop.create_task(cb(res))
-                        else:
-                            cb(res)
-                    except asyncio.CancelledError:  # getter is detached
-                        pass
-                    except Exception:
-                        raise
+                if self.channel._ring is not None:
+                    self.channel._ring.remove_reader(self._received_queue)
+                    self.channel._waiting_getters.discard(self)
 
-                wrapper.cb = cb
-                return wrapper
+                await self.channel._getters.remove(self)
+                self.channel._wakeup()  # channel loop could wait for this getter
+
+        def _run_callbacks(self, data):
+            for cb in self._callbacks:
+                cb(data)
 
-            self._callbacks.append(get_wrapper(callback))
+        def add_callback(self, callback, *, max_concurrency=None, executor=None, batch=False):
+            """
+            Sync callbacks are called when data is received (or in `executor` if passed),
+            async ones are run in tasks. No more than `max_concurrency` callbacks run at once,
+            data waits for its turn and silent getter stops receiving until callback catches up.
+            With `batch=True` callback gets a list of data received during one loop iteration.
+            """
+            self._callbacks.append(_Callback(callback, self.channel.loop, max_concurrency, executor, batch))
 
         def remove_callback(self, callback):
             for cb_wrapper in self._callbacks:
@@ -139,66 +769,354 @@ class Channel(AsyncIterable):
                     break
 
         async def __aiter__(self):
-            while not self._received_queue.empty():
-                data = await self._received_queue.get()
-                self._received_queue.task_done()
+            while self._received_queue:
+                data = self._received_queue.popleft()
+                self.channel._wakeup()
                 yield data
 
-    async def __ainit__(self, buffer_size=1):
+    async def __ainit__(self, buffer_size=1, *, mode='broadcast', strategy='round_robin', key=None,
+                        log=None, metrics=None):
+        if mode not in MODES:
+            raise ValueError(f'Unknown channel mode {mode!r}, expected one of {MODES}')
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unknown balance strategy {strategy!r}, expected one of {STRATEGIES}')
+
         # AiterableDeque can be edited while async iteration so no aditional mutex is needed
-        self._senders = await AiterableDeque()
-        self._getters = await AiterableDeque()
-        
+        self._senders = await AiterableDeque(indexed=True)
+        self._getters = await AiterableDeque(indexed=True)
+
+        self.mode = mode
+        self._ring = RingBuffer(buffer_size) if mode == 'ring' else None
+        self._waiting_getters = set()  # getters which wait for ring buffer data
+        self.strategy = strategy
+        self._next_getter_ix = 0  # round robin position for 'balance' mode
+        self.key = key  # data key for 'conflate' mode and getters topics
+        self._routed_getters = None  # getters snapshot which routes below were built for
+        self._plain_getters = ()  # getters without topics
+        self._topics = {}  # key -> topic -> getters
+        self._shares = None  # data of the next batch for every topic getter
+        self._log = log
+        # conflating getters and log take data whenever it's sent so senders aren't blocked by getters demand,
+        # balance channel still needs a getter with free space to hand data to
+        self._eager = mode == 'conflate' or log is not None
+
         self._getters_awaiting = asyncio.Event()
+        self._ready_senders = deque()  # attached senders which have data to send
+        self._wakeup_waiter = None
+        self._loop_iterations = 0  # the only counter of channel without metrics, it's read by metrics
         self.buffer_size = buffer_size
         self.loop = asyncio.get_event_loop()
-        
+
+        self._sender_cls, self._getter_cls = Channel.Sender, Channel.Getter
+        self._metrics = metrics
+        if metrics is not None:  # metrics replaces endpoint classes and wraps loop methods
+            metrics._bind(self)
+
         self._run_channel_task = self.loop.create_task(self._run_channel())
         self._run_channel_task.add_done_callback(self._handle_channel_loop_stop)
         self._loop_task_exception = ChannelError()
 
         self._finalizer = weakref.finalize(self, self._cancel_pipe_task)
 
-    async def new_sender(self):
-        sender = Channel.Sender(self, self.buffer_size)
+    async def new_sender(self, *, priority=0, weight=1):
+        """
+        Senders with higher `priority` are served first, senders of the same priority
+        share the channel in proportion to their `weight`.
+        """
+        sender = self._sender_cls(self, self.buffer_size, priority, weight)
+        self._schedule(sender)
         await self._senders.append(sender)
+        sender._attached = True
         return sender
 
-    async def new_getter(self, *, silent=False):
-        getter = Channel.Getter(self, self.buffer_size, silent)
+    async def new_senders(self, count, *, priority=0, weight=1):
+        """
+        Creates and attaches `count` senders in one step.
+        """
+        senders = [self._sender_cls(self, self.buffer_size, priority, weight) for _ in range(count)]
+        if senders:
+            self._schedule(senders[0])
+        self._senders.extend(senders)
+        for sender in senders:
+            sender._attached = True
+        return senders
+
+    async def new_threadsafe_sender(self, *, priority=0, weight=1):
+        """
+        Returns sender which `send`, `send_many` and `try_send` methods can be called from any thread.
+        """
+        return Channel.ThreadsafeSender(await self.new_sender(priority=priority, weight=weight))
+
+    def _schedule(self, sender):
+        # plain FIFO of ready senders is replaced with scheduler once it's needed
+        if (sender.priority or sender.weight != 1) and not isinstance(self._ready_senders, SenderScheduler):
+            ready = self._ready_senders
+            self._ready_senders = SenderScheduler(ready)
+            ready.clear()  # channel loop pass over old queue stops
+
+    async def new_getter(self, *, silent=False, overflow='block', topics=None, key=None, offset=None):
+        """
+        Getter with `topics` receives only data which `key(data)` (channel key by default) is one of topics.
+        Getter with `key` only receives data for which `key(data)` is true.
+        Getter with `offset` receives data of channel log starting from offset before new data.
+        """
+        getter = self._getter_cls(self, self.buffer_size, silent, overflow, topics, key, offset)
+        if offset is not None:
+            getter._replay_log()  # getter attaches itself after replay
+            return getter
+
         await self._getters.append(getter)
+        self._wakeup()
         return getter
 
+    async def new_getters(self, count, *, silent=False, overflow='block', topics=None, key=None):
+        """
+        Creates and attaches `count` getters in one step.
+        """
+        getters = [self._getter_cls(self, self.buffer_size, silent, overflow, topics, key) for _ in range(count)]
+        self._getters.extend(getters)
+        self._wakeup()
+        return getters
+
     def close(self):
         self._cancel_pipe_task()
 
+    def stats(self):
+        """
+        Returns snapshot of channel state. Counters are added if channel was created with `metrics`.
+        """
+        getter_depths = [len(getter._received_queue) for getter in self._getters.snapshot()]
+        stats = {
+            'mode': self.mode,
+            'buffer_size': self.buffer_size,
+            'senders': len(self._senders),
+            'getters': len(self._getters),
+            'ready_senders': len(self._ready_senders),
+            'sender_queue_depth': sum(len(sender._send_queue) for sender in self._senders.snapshot()),
+            'getter_queue_depth': sum(getter_depths),
+            'max_getter_queue_depth': max(getter_depths, default=0),
+        }
+        if self._metrics is not None:
+            stats.update(self._metrics.stats())
+        return stats
+
+    def _raise_if_stopped(self):
+        if self._run_channel_task.done():
+            raise ChannelError('Channe loop stopped with error!') from self._loop_task_exception
+
+    def _getters_free_space(self, queue):
+        """
+        Returns how many items of sender queue channel can deliver to getters at once (None if unlimited).
+        """
+        if self._ring is not None:
+            return self._ring.free_space()
+
+        if self.mode == 'balance':
+            free = 0
+            for getter in self._getters.snapshot():
+                getter_free = getter._free_space()
+                if getter_free is None:
+                    return None
+                free += getter_free
+            return free
+
+        if self._getters.snapshot() is not self._routed_getters:
+            self._update_routes()
+        free = None
+        for getter in self._plain_getters:
+            if getter.overflow != 'block':
+                continue
+            getter_free = getter._free_space()
+            if getter_free is not None and (free is None or getter_free < free):
+                free = getter_free
+
+        if self._topics:
+            free, self._shares = self._route(queue, free)
+        return free
+
+    def _wakeup_waiting_getters(self):
+        waiting, self._waiting_getters = self._waiting_getters, set()
+        for getter in waiting:
+            _wakeup_all(getter._waiters)
+
+    def _wakeup(self):
+        """
+        Called by endpoints when channel loop could be able to move data further.
+        """
+        waiter = self._wakeup_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def _wait_wakeup(self):
+        self._wakeup_waiter = self.loop.create_future()
+        try:
+            await self._wakeup_waiter
+        finally:
+            self._wakeup_waiter = None
+
     async def _run_channel(self):
-        while await self._getters_awaiting.wait():
-            async for sender in self._senders:
-                if sender._send_queue.empty():
-                    if sender._pending_self_task and not sender._pending_self_task.done():
-                        await sender._pending_self_task
-                    else:
-                        continue
+        # Loop sleeps until there are both ready senders and awaiting getters, so idle channel
+        # costs nothing and every pass handles only senders which have data.
+        while True:
+            self._loop_iterations += 1
+            ready = self._ready_senders
+            if not (ready and (self._getters_awaiting.is_set() or self._eager)):
+                await self._wait_wakeup()
+                continue
+
+            self._getters_awaiting.clear()
+            skipped = delivered = 0
+            for _ in range(len(ready)):
+                ready = self._ready_senders  # could be replaced with scheduler while loop awaits
+                if not ready:  # some senders were detached
+                    break
+
+                sender = ready.popleft()
+                free = self._getters_free_space(sender._send_queue)
+                if free == 0 and self._topics and sender._attached:
+                    # sender data waits for full topic getters, data of other senders could be routed elsewhere
+                    ready.append(sender)
+                    skipped += 1
+                    continue
+                while free == 0 and sender._attached:
+                    await self._wait_wakeup()
+                    free = self._getters_free_space(sender._send_queue)
+
+                if not (sender._attached and sender._send_queue):
+                    sender._ready = False
+                    continue
 
-                sender._pending_channel_task = self.loop.create_task(sender._send_queue.get())
-                data = await sender._pending_channel_task
-                sender._send_queue.task_done()
+                # everything that getters can fit is moved as a single batch
+                batch = sender._take(free)
+                if sender._send_queue:
+                    self._ready_senders.append(sender)
+                else:
+                    sender._ready = False
+                await self._deliver(batch)
+                delivered += 1
 
-                self._getters_awaiting.clear()
-                async for getter in self._getters:
-                    getter._pending_channel_task = self.loop.create_task(getter._received_queue.put(data))
-                    await getter._pending_channel_task
+            if skipped and not delivered:
+                await self._wait_wakeup()
 
-            await asyncio.sleep(0)
+    async def _deliver(self, batch):
+        if self._log is not None:
+            self._log.append(batch)
+
+        if self._ring is not None:
+            self._ring.extend(batch)
+            self._wakeup_waiting_getters()
+        elif self.mode == 'balance':
+            self._balance(batch)
+        else:
+            if self._getters.snapshot() is not self._routed_getters:
+                self._update_routes()
+            for getter in self._plain_getters:
+                if not getter._put(batch):
+                    await getter.detach()
+            if self._topics:
+                shares, self._shares = self._shares, None
+                if shares is None:  # topic getters were attached after free space was checked
+                    shares = self._route(batch)[1]
+                for getter, share in shares.items():
+                    if not getter._put(share):
+                        await getter.detach()
+
+    def _update_routes(self):
+        """
+        Rebuilds topics index, it's done only after getters were attached or detached.
+        """
+        getters = self._getters.snapshot()
+        plain, topics = [], {}
+        for getter in getters:
+            if getter.topics is None:
+                plain.append(getter)
+                continue
+            index = topics.setdefault(getter.key, {})
+            for topic in getter.topics:
+                index.setdefault(topic, []).append(getter)
+        self._routed_getters, self._plain_getters, self._topics = getters, plain, topics
+
+    def _route(self, queue, limit=None):
+        """
+        Returns how many leading items of queue can be delivered and their data for every subscribed
+        getter. Only getters which data is routed to limit it, so a full getter doesn't block
+        other topics. Key is computed once per message, message is skipped if key fails.
+        """
+        shares, space, count = {}, {}, 0
+        for data in queue if limit is None else islice(queue, limit):
+            targets = []
+            for key, index in self._topics.items():
+                try:
+                    getters = index.get(key(data))
+                except Exception as e:
+                    _report_error(self.loop, f'Exception in channel key {key!r}, message is skipped', e)
+                    continue
+                if getters is not None:
+                    targets.extend(getters)
+
+            for getter in targets:
+                if getter.overflow == 'block':
+                    if getter not in space:
+                        space[getter] = getter._free_space()
+                    if space[getter] == 0:
+                        return count, shares
+
+            for getter in targets:
+                share = shares.get(getter)
+                if share is None:
+                    shares[getter] = [data]
+                else:
+                    share.append(data)
+                if space.get(getter) is not None:
+                    space[getter] -= 1
+            count += 1
+        return count, shares
+
+    def _balance(self, batch):
+        """
+        Splits batch between getters, it should fit getters free space.
+        """
+        getters = self._getters.snapshot()
+        free = [getter._free_space() for getter in getters]  # None means unlimited
+        shares = [[] for _ in getters]
+
+        if self.strategy == 'round_robin':
+            ix = self._next_getter_ix % len(getters)
+            for data in batch:
+                while free[ix] == 0:
+                    ix = (ix + 1) % len(getters)
+                shares[ix].append(data)
+                if free[ix] is not None:
+                    free[ix] -= 1
+                ix = (ix + 1) % len(getters)
+            self._next_getter_ix = ix
+        else:  # least_loaded
+            loads = [(len(getter._received_queue), ix) for ix, getter in enumerate(getters) if free[ix] != 0]
+            heapify(loads)
+            for data in batch:
+                load, ix = loads[0]
+                shares[ix].append(data)
+                if free[ix] is not None:
+                    free[ix] -= 1
+                if free[ix] == 0:
+                    heappop(loads)
+                else:
+                    heapreplace(loads, (load + 1, ix))
+
+        for getter, share in zip(getters, shares):
+            if share:
+                getter._put(share)
 
     def _handle_channel_loop_stop(self, future):
         async def detach_all():
-            async for node in self._senders:
+            for node in self._senders.snapshot():
                 await node.detach()
-            async for node in self._getters:
+            for node in self._getters.snapshot():
                 await node.detach()
 
+        if future.cancelled():  # channel was closed
+            return
+
         try:
             future.result()
         except Exception as e:
@@ -215,8 +1133,6 @@ class Channel(AsyncIterable):
 
     async def __aiter__(self):
         async for sender in self._senders:
-            if sender._send_queue.empty():
+            if not sender._send_queue:
                 continue
-            data = await sender._send_queue.get()
-            sender._send_queue.task_done()
-            yield data
+            yield sender._take(1)[0]
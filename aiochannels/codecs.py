@@ -0,0 +1,341 @@
+"""
+Codecs serialize data which leaves the process (shared memory and network transports).
+
+Codec `encode` returns a list of bytes-like segments, payload is their concatenation, so
+transports copy segments straight into shared memory or socket buffers without joining them.
+`decode` gets a memoryview of the payload which transport keeps valid for decoded data,
+so out-of-band buffers are decoded without copies. `decode_copy` gets payload as a list of views
+of memory which is reused right after the call (shared memory ring, payload can wrap around its end),
+it copies only what decoded data keeps and copies it once.
+`dumps` and `loads` make any codec usable where `serializer` with those methods is expected.
+"""
+import pickle
+import struct
+
+_U32 = struct.Struct('>I')
+_TRAILER = struct.Struct('>IB')  # out-of-band buffers count, zero byte
+_STOP = pickle.STOP[0]
+
+PICKLE_OOB = pickle.HIGHEST_PROTOCOL >= 5  # out-of-band buffers require python 3.8+
+
+
+class Codec:
+    __slots__ = ()
+
+    def encode(self, data):
+        raise NotImplementedError
+
+    def decode(self, view):
+        raise NotImplementedError
+
+    def decode_copy(self, segments):
+        """
+        Decodes payload which is concatenation of views which aren't valid after the call,
+        so decoded data can't reference them.
+        """
+        return self.decode(memoryview(bytearray().join(segments)))
+
+    def dumps(self, data):
+        return b''.join(self.encode(data))
+
+    def loads(self, payload):
+        return self.decode(memoryview(payload))
+
+
+class SerializerCodec(Codec):
+    """
+    Adapts serializer with `dumps`/`loads` methods (`pickle` module for example).
+    """
+    __slots__ = ('serializer',)
+
+    def __init__(self, serializer=pickle):
+        self.serializer = serializer
+
+    def encode(self, data):
+        return [self.serializer.dumps(data)]
+
+    def decode(self, view):
+        return self.serializer.loads(bytes(view))
+
+    def decode_copy(self, segments):
+        return self.serializer.loads(b''.join(segments))
+
+
+def as_codec(serializer):
+    """
+    Returns codec for `serializer` argument of transports, `pickle` is used by default.
+    """
+    if serializer is None:
+        return PickleCodec()
+    if isinstance(serializer, Codec):
+        return serializer
+    return SerializerCodec(serializer)
+
+
+def _copy(segments, start, end):
+    """
+    Copies bytes from start to end of payload split into segments.
+    """
+    data, offset = bytearray(end - start), 0
+    with memoryview(data) as view:  # bytearray slice assignment would copy segment first
+        for segment in segments:
+            low, high = max(start, offset), min(end, offset + len(segment))
+            if low < high:
+                view[low - start:high - start] = segment[low - offset:high - offset]
+            offset += len(segment)
+    return data
+
+
+def _view(segments, start, end):
+    """
+    Returns view of bytes from start to end of payload, they are copied only if they span segments.
+    """
+    offset = 0
+    for segment in segments:
+        if offset <= start and end <= offset + len(segment):
+            return segment[start - offset:end - offset]
+        offset += len(segment)
+    return memoryview(_copy(segments, start, end))
+
+
+def _bytearray(buffer):
+    # buffers copied by `decode_copy` are bytearrays already, so they aren't copied again
+    return buffer if type(buffer) is bytearray else bytearray(buffer)
+
+
+class _OutOfBand:
+    """
+    Makes pickle pass buffer of `bytearray` out-of-band, it's pickled in-band by default.
+    """
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __reduce_ex__(self, protocol):
+        return _bytearray, (pickle.PickleBuffer(self.obj),)
+
+
+class PickleCodec(Codec):
+    """
+    Pickle protocol 5 codec. Buffers of objects which support out-of-band pickling
+    (NumPy arrays, `PickleBuffer` and `bytearray` messages of at least `oob_size` bytes)
+    are not copied into pickle stream, they are separate segments and are decoded
+    from views of received payload.
+    Payload without buffers is a plain pickle, otherwise pickle stream is followed by buffers
+    and a trailer of their sizes, count and zero byte (pickle stream always ends with STOP).
+    """
+    __slots__ = ('protocol', 'oob_size')
+
+    def __init__(self, protocol=pickle.HIGHEST_PROTOCOL, oob_size=1024):
+        self.protocol = protocol
+        self.oob_size = oob_size
+
+    def encode(self, data):
+        if not (PICKLE_OOB and self.protocol >= 5):
+            return [pickle.dumps(data, protocol=self.protocol)]
+
+        if type(data) is bytearray and len(data) >= self.oob_size:
+            data = _OutOfBand(data)
+        buffers = []
+        stream = pickle.dumps(data, protocol=self.protocol, buffer_callback=buffers.append)
+        if not buffers:
+            return [stream]
+
+        buffers = [buffer.raw() for buffer in buffers]
+        trailer = struct.pack(f'>{len(buffers) + 1}IB', *(buffer.nbytes for buffer in buffers), len(buffers), 0)
+        return [stream, *buffers, trailer]
+
+    def decode(self, view):
+        """
+        Out-of-band buffers are views of payload, `bytearray` messages are copied from them once.
+        """
+        if view[-1] == _STOP:
+            return pickle.loads(view)
+        stream, buffers = self._split(view)
+        return pickle.loads(stream, buffers=buffers)
+
+    def decode_copy(self, segments):
+        """
+        Every out-of-band buffer is copied once straight from segments into a `bytearray`
+        which decoded data owns, in-band data is copied into objects by pickle anyway.
+        """
+        total = sum(len(segment) for segment in segments)
+        if _view(segments, total - 1, total)[0] == _STOP:
+            return pickle.loads(_view(segments, 0, total))
+
+        end = total - _TRAILER.size
+        count, _ = _TRAILER.unpack(_view(segments, end, total))
+        end -= _U32.size * count
+        sizes = struct.unpack(f'>{count}I', _view(segments, end, end + _U32.size * count))
+        buffers = []
+        for size in reversed(sizes):
+            buffers.append(_copy(segments, end - size, end))
+            end -= size
+        buffers.reverse()
+        return pickle.loads(_view(segments, 0, end), buffers=buffers)
+
+    @staticmethod
+    def _split(view):
+        end = len(view) - _TRAILER.size
+        count, _ = _TRAILER.unpack_from(view, end)
+        end -= _U32.size * count
+        sizes = struct.unpack_from(f'>{count}I', view, end)
+        buffers = []
+        for size in reversed(sizes):
+            buffers.append(view[end - size:end])
+            end -= size
+        buffers.reverse()
+        return view[:end], buffers
+
+
+class RawCodec(Codec):
+    """
+    Passes `bytes`, `bytearray` and other contiguous buffers as is.
+    Data is decoded as a read-only memoryview of received payload.
+    """
+    __slots__ = ()
+
+    def encode(self, data):
+        return [memoryview(data).cast('B')]
+
+    def decode(self, view):
+        return view.toreadonly() if hasattr(view, 'toreadonly') else view
+
+    def decode_copy(self, segments):
+        return memoryview(b''.join(segments))
+
+
+# Compact codec tags
+_NONE, _TRUE, _FALSE, _INT, _BIGINT, _FLOAT, _STR, _BYTES, _LIST, _TUPLE, _DICT = b'NTFiIdsbltm'
+_INT_FORMAT, _FLOAT_FORMAT = struct.Struct('>q'), struct.Struct('>d')
+_TAGGED_INT, _TAGGED_FLOAT, _TAGGED_U32 = struct.Struct('>Bq'), struct.Struct('>Bd'), struct.Struct('>BI')
+_INT_MIN, _INT_MAX = -1 << 63, (1 << 63) - 1
+
+
+class CompactCodec(Codec):
+    """
+    Compact tagged binary format in msgpack manner for None, bool, int, float, str, bytes,
+    lists, tuples and dicts. Messages are smaller than pickled ones and carry no type
+    information, so untrusted peers can't make decoding run code.
+    """
+    __slots__ = ()
+
+    def encode(self, data):
+        out = bytearray()
+        self._encode(data, out)
+        return [out]
+
+    def _encode(self, data, out):
+        cls = type(data)
+        if data is None:
+            out.append(_NONE)
+        elif cls is bool:
+            out.append(_TRUE if data else _FALSE)
+        elif cls is int:
+            if _INT_MIN <= data <= _INT_MAX:
+                out += _TAGGED_INT.pack(_INT, data)
+            else:
+                digits = str(data).encode()
+                out += _TAGGED_U32.pack(_BIGINT, len(digits))
+                out += digits
+        elif cls is float:
+            out += _TAGGED_FLOAT.pack(_FLOAT, data)
+        elif cls is str:
+            encoded = data.encode()
+            out += _TAGGED_U32.pack(_STR, len(encoded))
+            out += encoded
+        elif cls in (bytes, bytearray, memoryview):
+            if cls is memoryview:
+                data = data.cast('B')
+            out += _TAGGED_U32.pack(_BYTES, len(data))
+            out += data
+        elif cls in (list, tuple):
+            out += _TAGGED_U32.pack(_LIST if cls is list else _TUPLE, len(data))
+            for item in data:
+                self._encode(item, out)
+        elif cls is dict:
+            out += _TAGGED_U32.pack(_DICT, len(data))
+            for key, value in data.items():
+                self._encode(key, out)
+                self._encode(value, out)
+        else:
+            raise TypeError(f'{cls.__name__} is not supported by CompactCodec!')
+
+    def decode(self, view):
+        data, _ = self._decode(view, 0)
+        return data
+
+    def decode_copy(self, segments):
+        # decoded data never references payload, so only payload which wraps is joined
+        return self.decode(segments[0] if len(segments) == 1 else memoryview(b''.join(segments)))
+
+    def _decode(self, view, offset):
+        tag = view[offset]
+        offset += 1
+        if tag == _NONE:
+            return None, offset
+        if tag == _TRUE:
+            return True, offset
+        if tag == _FALSE:
+            return False, offset
+        if tag == _INT:
+            return _INT_FORMAT.unpack_from(view, offset)[0], offset + _INT_FORMAT.size
+        if tag == _FLOAT:
+            return _FLOAT_FORMAT.unpack_from(view, offset)[0], offset + _FLOAT_FORMAT.size
+
+        size, = _U32.unpack_from(view, offset)
+        offset += _U32.size
+        if tag == _STR:
+            return str(view[offset:offset + size], 'utf-8'), offset + size
+        if tag == _BYTES:
+            return bytes(view[offset:offset + size]), offset + size
+        if tag == _BIGINT:
+            return int(str(view[offset:offset + size], 'ascii')), offset + size
+        if tag in (_LIST, _TUPLE):
+            items = []
+            for _ in range(size):
+                item, offset = self._decode(view, offset)
+                items.append(item)
+            return (items if tag == _LIST else tuple(items)), offset
+        if tag == _DICT:
+            result = {}
+            for _ in range(size):
+                key, offset = self._decode(view, offset)
+                result[key], offset = self._decode(view, offset)
+            return result, offset
+        raise ValueError(f'Unknown CompactCodec tag {tag!r}!')
+
+
+class CodecRegistry(Codec):
+    """
+    Chooses codec by exact type of data, `default` codec (pickle) is used for other types.
+    Payload starts with a byte of codec number, so both sides should register the same
+    codecs in the same order.
+    """
+    __slots__ = ('default', '_codecs', '_by_type', '_tags')
+
+    def __init__(self, default=None):
+        self.default = default if default is not None else PickleCodec()
+        self._codecs = [self.default]
+        self._by_type = {}
+        self._tags = [b'\0']  # one byte prefix for every codec
+
+    def register(self, cls, codec):
+        if codec not in self._codecs:
+            if len(self._codecs) > 255:
+                raise ValueError('Too many codecs!')
+            self._codecs.append(codec)
+            self._tags.append(bytes((len(self._codecs) - 1,)))
+        self._by_type[cls] = self._codecs.index(codec)
+
+    def encode(self, data):
+        number = self._by_type.get(type(data), 0)
+        return [self._tags[number], *self._codecs[number].encode(data)]
+
+    def decode(self, view):
+        return self._codecs[view[0]].decode(view[1:])
+
+    def decode_copy(self, segments):
+        segments = [segment for segment in segments if segment]
+        return self._codecs[segments[0][0]].decode_copy([segments[0][1:], *segments[1:]])
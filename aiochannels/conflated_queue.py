@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+def _same_key(data):
+    return None
+
+
+class ConflatedQueue:
+    """
+    Getter's queue which keeps only the latest value per key. New value replaces pending one
+    in its place, so getter receives keys in order of their first pending update.
+    Supports `len`, `popleft`, `extend` and `extendleft` like a deque does.
+    Values which key fails on are dropped and passed to `on_error`.
+    """
+    __slots__ = ('key', 'dropped', '_items', '_on_error')
+
+    def __init__(self, key=None, on_error=None):
+        self.key = key or _same_key  # without key every value replaces previous one
+        self._on_error = on_error
+        self.dropped = 0  # values replaced before getter received them
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _error(self, e):
+        if self._on_error is not None:
+            self._on_error(e)
+
+    def popleft(self):
+        if not self._items:
+            raise IndexError('Pop from empty queue!')
+        return self._items.popitem(last=False)[1]
+
+    def extend(self, batch):
+        items, key = self._items, self.key
+        size = len(items)
+        for data in batch:
+            try:
+                items[key(data)] = data
+            except Exception as e:
+                self._error(e)
+        self.dropped += len(batch) - (len(items) - size)
+
+    def extendleft(self, batch):
+        """
+        Returns received values back, values which have newer updates are dropped.
+        """
+        items, key = self._items, self.key
+        for data in batch:
+            try:
+                k = key(data)
+                hash(k)
+            except Exception as e:
+                self._error(e)
+                self.dropped += 1
+                continue
+            if k in items:
+                self.dropped += 1
+            else:
+                items[k] = data
+                items.move_to_end(k, last=False)
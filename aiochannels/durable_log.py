@@ -0,0 +1,243 @@
+"""
+Append-only log of channel data on disk.
+
+Log is a directory of segment files named by offset of their first message. Every record is
+length prefixed serialized data, one channel batch is written with one `write` call and files are
+fsynced not more often than once per `fsync_interval`. Writes and fsyncs run in a writer thread,
+so channel loop doesn't wait for disk, records which aren't written yet are read from memory.
+Segments are read with `mmap`, positions of records are kept in memory so reading from any offset
+doesn't scan files.
+"""
+import os
+import mmap
+import struct
+import asyncio
+import threading
+
+from array import array
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from .codecs import as_codec
+
+_LENGTH = struct.Struct('>I')
+_SUFFIX = '.log'
+
+
+class _Segment:
+    __slots__ = ('base', 'path', 'positions', 'size', '_map')
+
+    def __init__(self, base, path):
+        self.base = base  # offset of the first record
+        self.path = path
+        self.positions = array('Q')  # file positions of records
+        self.size = 0  # bytes of complete records
+        self._map = None
+
+    def scan(self):
+        """
+        Builds records index, incomplete record left by crash is truncated.
+        """
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        pos = 0
+        while pos + _LENGTH.size <= len(data):
+            end = pos + _LENGTH.size + _LENGTH.unpack_from(data, pos)[0]
+            if end > len(data):
+                break
+            self.positions.append(pos)
+            pos = end
+        self.size = pos
+        if pos < len(data):
+            os.truncate(self.path, pos)
+
+    def read(self, index, max_items):
+        """
+        Returns payloads of up to max_items records starting from record index.
+        """
+        if index >= len(self.positions):
+            return []
+
+        if self._map is None or len(self._map) < self.size:  # active segment has grown
+            self.close()
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+
+        data, payloads = self._map, []
+        for pos in self.positions[index:index + max_items]:
+            start = pos + _LENGTH.size
+            payloads.append(data[start:start + _LENGTH.unpack_from(data, pos)[0]])
+        return payloads
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class DurableLog:
+    """
+    Segmented log for `Channel(log=...)`. Data is serialized with `PickleCodec` by default,
+    pass other codec or `serializer` with `dumps`/`loads` to change it. New segment is started when
+    active one exceeds `segment_size` bytes. With `fsync_interval=0` every write is fsynced.
+    `close` waits for all writes and fsyncs the active segment.
+    """
+
+    def __init__(self, path, *, segment_size=64 << 20, fsync_interval=1.0, serializer=None):
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self._codec = as_codec(serializer)
+        self._fsync_handle = None
+
+        os.makedirs(path, exist_ok=True)
+        self._segments = []
+        for name in sorted(name for name in os.listdir(path) if name.endswith(_SUFFIX)):
+            segment = _Segment(int(name[:-len(_SUFFIX)]), os.path.join(path, name))
+            segment.scan()
+            self._segments.append(segment)
+        if not self._segments:
+            self._segments.append(self._new_segment(0))
+
+        active = self._segments[-1]
+        self._end_offset = active.base + len(active.positions)
+        self._active_size = active.size  # including records which aren't written yet
+
+        # written by writer thread, `_lock` guards records index and unwritten records
+        self._lock = threading.Lock()
+        self._unwritten = deque()  # data of records after `_written_offset`
+        self._written_offset = self._end_offset
+        self._error = None
+        self._fd = None
+        self._fd_segment = None
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def _new_segment(self, base):
+        return _Segment(base, os.path.join(self.path, f'{base:020d}{_SUFFIX}'))
+
+    @property
+    def start_offset(self):
+        return self._segments[0].base
+
+    @property
+    def end_offset(self):
+        """
+        Offset of the next appended message.
+        """
+        return self._end_offset
+
+    def append(self, batch):
+        if self._error is not None:
+            raise self._error
+        if not batch:
+            return
+
+        active = self._segments[-1]
+        parts, positions, pos = [], array('Q'), self._active_size
+        for data in batch:
+            segments = self._codec.encode(data)
+            length = sum(len(segment) for segment in segments)
+            parts.append(_LENGTH.pack(length))
+            parts.extend(segments)
+            positions.append(pos)
+            pos += _LENGTH.size + length
+
+        with self._lock:
+            self._unwritten.extend(batch)
+        self._writer.submit(self._write, active, b''.join(parts), positions, pos)
+        self._end_offset += len(batch)
+        self._active_size = pos
+
+        if pos >= self.segment_size:
+            self._segments.append(self._new_segment(self._end_offset))
+            self._active_size = 0
+        self._schedule_fsync()
+
+    def _write(self, segment, data, positions, size):
+        """
+        Runs in writer thread, records are readable from file after they are written.
+        """
+        if self._error is not None:  # records after failed write are kept in memory only
+            return
+        try:
+            if segment is not self._fd_segment:  # the first write or new segment
+                self._close_fd()
+                self._fd = os.open(segment.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+                self._fd_segment = segment
+            os.write(self._fd, data)
+            if self.fsync_interval <= 0:
+                os.fsync(self._fd)
+        except Exception as e:
+            self._error = e
+            return
+
+        with self._lock:
+            segment.positions.extend(positions)
+            segment.size = size
+            self._written_offset += len(positions)
+            for _ in range(len(positions)):
+                self._unwritten.popleft()
+
+    def _schedule_fsync(self):
+        if self.fsync_interval > 0 and self._fsync_handle is None:
+            loop = asyncio.get_event_loop()
+            self._fsync_handle = loop.call_later(self.fsync_interval, self._fsync)
+
+    def _fsync(self):
+        self._fsync_handle = None
+        self._writer.submit(self._sync)
+
+    def _sync(self):
+        if self._fd is not None and self._error is None:
+            try:
+                os.fsync(self._fd)
+            except Exception as e:
+                self._error = e
+
+    def _close_fd(self):
+        if self._fd is not None:
+            self._sync()
+            os.close(self._fd)
+            self._fd = self._fd_segment = None
+
+    def read(self, offset, max_items):
+        """
+        Returns up to max_items messages starting from offset (or from the start of log if it's older).
+        """
+        offset = max(offset, self.start_offset)
+        with self._lock:
+            written = max(0, min(max_items, self._written_offset - offset))
+            payloads = self._read_payloads(offset, written)
+            start = max(0, offset - self._written_offset)
+            batch = list(islice(self._unwritten, start, start + max_items - len(payloads)))
+        return [self._codec.decode(memoryview(payload)) for payload in payloads] + batch
+
+    def _read_payloads(self, offset, max_items):
+        payloads = []
+        if not max_items:
+            return payloads
+        for segment in reversed(self._segments):
+            if segment.base > offset:
+                continue
+            index = offset - segment.base
+            while segment is not None and len(payloads) < max_items:
+                payloads.extend(segment.read(index, max_items - len(payloads)))
+                segment, index = self._next_segment(segment), 0
+            break
+        return payloads
+
+    def _next_segment(self, segment):
+        ix = self._segments.index(segment) + 1
+        return self._segments[ix] if ix < len(self._segments) else None
+
+    def close(self):
+        if self._fsync_handle is not None:
+            self._fsync_handle.cancel()
+            self._fsync_handle = None
+        self._writer.submit(self._close_fd)
+        self._writer.shutdown(wait=True)
+        for segment in self._segments:
+            segment.close()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,307 @@
+"""
+Channel instrumentation.
+
+Metrics are enabled per channel with `Channel(metrics=Metrics(...))`. Instrumented channel
+creates metered endpoints and wraps its loop methods, so channel without metrics only counts
+its loop iterations and pays nothing else for instrumentation.
+"""
+from time import perf_counter
+from collections import deque
+
+from .channel import Channel, _report_error
+from .conflated_queue import ConflatedQueue
+
+_MAX_PENDING_SAMPLES = 1024  # per endpoint, older samples of data nobody receives are dropped
+
+
+class Metrics:
+    """
+    Counters of one channel.
+
+    `sizer` is a callable which returns message size in bytes (e.g. `len`), bytes are not counted without it.
+    Every `latency_sample`-th sent message is used to measure send-to-receive latency (0 disables it)
+    from the moment it's put into sender buffer, every getter which receives it records its own latency. Latency isn't measured
+    in ring and conflate channels.
+    `exporter` is called with `channel.stats()` every `export_interval` seconds.
+    """
+
+    def __init__(self, *, sizer=None, latency_sample=0, exporter=None, export_interval=10):
+        self.sizer = sizer
+        self.latency_sample = latency_sample
+        self.exporter = exporter
+        self.export_interval = export_interval
+
+        self.channel = None
+        self.sent = self.received = 0
+        self.sent_bytes = self.received_bytes = 0
+        self.send_blocked_time = self.get_blocked_time = 0.0
+        self.delivered_batches = 0
+        self.latency_buckets = {}  # power of two microseconds -> count
+        self._sample_countdown = latency_sample
+        self._batch_samples = None  # (batch, its first sequence number, [(sequence number, send time)])
+        self._export_handle = None
+
+    def _bind(self, channel):
+        if self.channel is not None:
+            raise ValueError('Metrics instance is already used by another channel!')
+
+        self.channel = channel
+        channel._sender_cls = MeteredSender
+        channel._getter_cls = MeteredGetter
+
+        deliver = channel._deliver
+
+        async def metered_deliver(batch):
+            self.delivered_batches += 1
+            try:
+                await deliver(batch)
+            finally:
+                self._batch_samples = None
+
+        channel._deliver = metered_deliver
+
+        if self.exporter is not None:
+            self._export_handle = channel.loop.call_later(self.export_interval, self._export)
+
+    def _export(self):
+        if self.channel._run_channel_task.done():
+            return
+
+        try:
+            self.exporter(self.channel.stats())
+        except Exception as e:  # exporter errors shouldn't stop exporting
+            _report_error(self.channel.loop, f'Exception in metrics exporter {self.exporter!r}', e)
+        self._export_handle = self.channel.loop.call_later(self.export_interval, self._export)
+
+    def _sample(self):
+        """
+        Returns True for every `latency_sample`-th sent message.
+        """
+        self._sample_countdown -= 1
+        if self._sample_countdown > 0:
+            return False
+        self._sample_countdown = self.latency_sample
+        return True
+
+    @property
+    def loop_iterations(self):
+        return self.channel._loop_iterations if self.channel is not None else 0
+
+    def _record_latency(self, sent_at, now):
+        bucket = 1 << int((now - sent_at) * 1e6).bit_length()
+        self.latency_buckets[bucket] = self.latency_buckets.get(bucket, 0) + 1
+
+    def _latency_percentile(self, percent):
+        total = sum(self.latency_buckets.values())
+        seen = 0
+        for bucket in sorted(self.latency_buckets):
+            seen += self.latency_buckets[bucket]
+            if seen * 100 >= total * percent:
+                return bucket / 1e6
+        return None
+
+    def stats(self):
+        stats = {
+            'sent': self.sent,
+            'received': self.received,
+            'send_blocked_time': self.send_blocked_time,
+            'get_blocked_time': self.get_blocked_time,
+            'loop_iterations': self.loop_iterations,
+            'delivered_batches': self.delivered_batches,
+        }
+        if self.sizer is not None:
+            stats['sent_bytes'] = self.sent_bytes
+            stats['received_bytes'] = self.received_bytes
+        if self.latency_sample:
+            # upper bounds of buckets in seconds
+            stats['latency_histogram'] = {bucket / 1e6: count for bucket, count in sorted(self.latency_buckets.items())}
+            stats['latency_p50'] = self._latency_percentile(50)
+            stats['latency_p99'] = self._latency_percentile(99)
+        return stats
+
+
+class _SampledQueue(deque):
+    """
+    Sender buffer which samples data when it's put in, so data which is never put in (cancelled `send`)
+    isn't sampled and data put in by `select` or threadsafe sender is.
+    """
+
+    def __init__(self, metrics):
+        super().__init__()
+        self.metrics = metrics
+        self.queued = 0  # data put into buffer
+        self.samples = deque(maxlen=_MAX_PENDING_SAMPLES)  # (position in queued data, time)
+
+    def append(self, data):
+        if self.metrics._sample():
+            self.samples.append((self.queued, perf_counter()))
+        self.queued += 1
+        super().append(data)
+
+    def extend(self, iterable):
+        items = list(iterable)
+        now, metrics = perf_counter(), self.metrics
+        for position in range(self.queued, self.queued + len(items)):
+            if metrics._sample():
+                self.samples.append((position, now))
+        self.queued += len(items)
+        super().extend(items)
+
+
+class MeteredSender(Channel.Sender):
+    __slots__ = ('sent', 'sent_bytes', 'blocked_time', '_samples')
+
+    def __init__(self, channel, bs, priority=0, weight=1):
+        super().__init__(channel, bs, priority, weight)
+        self.sent = self.sent_bytes = 0
+        self.blocked_time = 0.0
+        self._samples = ()  # (position in sent data, time of putting it into buffer)
+        if channel._metrics.latency_sample:
+            self._send_queue = _SampledQueue(channel._metrics)
+            self._samples = self._send_queue.samples
+
+    async def _wait_for_space(self):
+        if not self._full():
+            return
+
+        start = perf_counter()
+        try:
+            await super()._wait_for_space()
+        finally:
+            blocked = perf_counter() - start
+            self.blocked_time += blocked
+            self.channel._metrics.send_blocked_time += blocked
+
+    def _take(self, max_items=None):
+        # counted when channel takes data, so data sent with any method is counted once
+        batch = super()._take(max_items)
+        metrics = self.channel._metrics
+        if self._samples:
+            self._tag_samples(batch, metrics)
+        self.sent += len(batch)
+        metrics.sent += len(batch)
+        if metrics.sizer is not None:
+            size = sum(map(metrics.sizer, batch))
+            self.sent_bytes += size
+            metrics.sent_bytes += size
+        return batch
+
+    def _tag_samples(self, batch, metrics):
+        """
+        Tags samples of taken data with channel sequence numbers, data is taken in order it was sent.
+        """
+        samples, end = self._samples, self.sent + len(batch)
+        tagged = []
+        while samples and samples[0][0] < end:
+            position, sent_at = samples.popleft()
+            if position >= self.sent:
+                tagged.append((metrics.sent + position - self.sent, sent_at))
+        metrics._batch_samples = (batch, metrics.sent, tagged) if tagged else None
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(sent=self.sent, blocked_time=self.blocked_time)
+        if self.channel._metrics.sizer is not None:
+            stats['sent_bytes'] = self.sent_bytes
+        return stats
+
+
+class MeteredGetter(Channel.Getter):
+    __slots__ = ('received', 'received_bytes', 'blocked_time', '_put_count', '_skipped', '_samples')
+
+    def __init__(self, channel, bs, silent, overflow='block', topics=None, key=None, offset=None):
+        super().__init__(channel, bs, silent, overflow, topics, key, offset)
+        self.received = self.received_bytes = 0
+        self.blocked_time = 0.0
+        self._put_count = 0  # data put into getter buffer
+        self._skipped = 0  # data dropped from getter buffer by 'drop_oldest' policy
+        self._samples = deque(maxlen=_MAX_PENDING_SAMPLES)  # (position in put data, send time)
+
+    def _put(self, batch):
+        if isinstance(self._received_queue, ConflatedQueue):
+            return super()._put(batch)
+
+        dropped = self._dropped
+        result = super()._put(batch)
+        dropped = self._dropped - dropped
+        if self.overflow == 'drop_oldest':
+            put, self._skipped = len(batch), self._skipped + dropped
+        else:
+            put = len(batch) - dropped
+
+        delivered = self.channel._metrics._batch_samples
+        if delivered is not None:
+            self._add_samples(batch, put, *delivered)
+        self._put_count += put
+
+        if dropped and self._samples:
+            consumed = self.received + self._skipped
+            while self._samples and self._samples[0][0] < consumed:  # sampled data was dropped
+                self._samples.popleft()
+        return result
+
+    def _add_samples(self, batch, put, delivered_batch, first, tagged):
+        if batch is delivered_batch:  # the whole batch, positions are known from sequence numbers
+            for seq, sent_at in tagged:
+                if seq - first < put:
+                    self._samples.append((self._put_count + seq - first, sent_at))
+        else:  # share of topic or balance getter, samples are found by data identity
+            times = {}
+            for seq, sent_at in tagged:
+                times.setdefault(id(delivered_batch[seq - first]), deque()).append(sent_at)
+            for ix in range(put):
+                data_times = times.get(id(batch[ix]))
+                if data_times:
+                    self._samples.append((self._put_count + ix, data_times.popleft()))
+
+    def _count(self, batch):
+        metrics = self.channel._metrics
+        self.received += len(batch)
+        metrics.received += len(batch)
+        if metrics.sizer is not None:
+            size = sum(map(metrics.sizer, batch))
+            self.received_bytes += size
+            metrics.received_bytes += size
+        if self._samples:
+            samples, consumed, now = self._samples, self.received + self._skipped, perf_counter()
+            while samples and samples[0][0] < consumed:
+                metrics._record_latency(samples.popleft()[1], now)
+
+    async def _wait_for_data(self, timeout=None):
+        if self._received_queue:
+            return await super()._wait_for_data(timeout)
+
+        start = perf_counter()
+        try:
+            return await super()._wait_for_data(timeout)
+        finally:
+            blocked = perf_counter() - start
+            self.blocked_time += blocked
+            self.channel._metrics.get_blocked_time += blocked
+
+    def _get_nowait(self):
+        data = super()._get_nowait()
+        self._count((data,))
+        return data
+
+    async def get_many(self, max_items, timeout=None):
+        batch = await super().get_many(max_items, timeout)
+        self._count(batch)
+        return batch
+
+    async def get_batch(self, max_items, max_wait):
+        batch = await super().get_batch(max_items, max_wait)
+        self._count(batch)
+        return batch
+
+    async def __aiter__(self):
+        async for data in super().__aiter__():
+            self._count((data,))
+            yield data
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(received=self.received, blocked_time=self.blocked_time)
+        if self.channel._metrics.sizer is not None:
+            stats['received_bytes'] = self.received_bytes
+        return stats
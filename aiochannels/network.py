@@ -0,0 +1,361 @@
+"""
+Channel transport over unix domain or TCP sockets.
+
+Broker serves a local Channel with `serve_channel`, remote processes attach endpoints with
+`connect_sender` and `connect_getter`. Every connection is one endpoint. Frames are length
+prefixed and carry batches of messages, so senders pipeline data without waiting for replies.
+Flow control is credit based: an endpoint may have at most channel `buffer_size` messages
+in flight, credits are returned when broker channel (or remote getter) takes data.
+
+Broker process can be started with `python -m aiochannels.network --unix /tmp/channel.sock`.
+"""
+import sys
+import struct
+import asyncio
+import argparse
+
+from collections import deque, AsyncIterable
+
+from .channel import Channel, ChannelError, _wakeup_next, _release_waiter, _fail_all, _report_error
+from .codecs import as_codec
+from .utils import asynclshift
+
+_FRAME = struct.Struct('>IB')  # payload length, frame type
+_U32 = struct.Struct('>I')
+
+_HELLO, _CREDIT, _DATA = 1, 2, 3
+_SENDER_ROLE, _GETTER_ROLE = b'S', b'G'
+
+DEFAULT_WINDOW = 1024  # credits for channels with unlimited buffer
+
+
+def _frame(frame_type, payload=b''):
+    return _FRAME.pack(len(payload), frame_type) + payload
+
+
+def _batch_frame(encoded):
+    """
+    Returns data frame as a list of parts for `writelines`, every message is a list
+    of codec segments, so segments aren't joined before they are written.
+    """
+    parts = [None, _U32.pack(len(encoded))]
+    size = _U32.size
+    for segments in encoded:
+        length = sum(len(segment) for segment in segments)
+        parts.append(_U32.pack(length))
+        parts.extend(segments)
+        size += _U32.size + length
+    parts[0] = _FRAME.pack(size, _DATA)
+    return parts
+
+
+def _unpack_batch(payload):
+    """
+    Returns views of frame payload, messages are decoded without copying them out of frame.
+    """
+    view = memoryview(payload)
+    count, = _U32.unpack_from(view, 0)
+    offset, batch = _U32.size, []
+    for _ in range(count):
+        size, = _U32.unpack_from(view, offset)
+        offset += _U32.size
+        batch.append(view[offset:offset + size])
+        offset += size
+    return batch
+
+
+async def _read_frame(reader):
+    """
+    Returns (frame type, payload) or (None, None) if connection is closed.
+    """
+    try:
+        size, frame_type = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+        return frame_type, await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None, None
+
+
+async def _open_connection(path, host, port):
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+class _RemoteEndpoint:
+    __slots__ = ('_reader', '_writer', '_codec', '_waiters', '_reader_task', 'buffer_size')
+
+    def __init__(self, reader, writer, serializer, buffer_size):
+        self._reader = reader
+        self._writer = writer
+        self._codec = as_codec(serializer)
+        self._waiters = deque()
+        self.buffer_size = buffer_size
+        self._reader_task = asyncio.get_event_loop().create_task(self._read_frames())
+
+    @property
+    def is_attached(self):
+        return not self._reader_task.done()
+
+    async def _wait(self, timeout=None):
+        if not self.is_attached:
+            raise ChannelError('Connection is closed!')
+
+        loop = asyncio.get_event_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = None if timeout is None else loop.call_later(timeout, _release_waiter, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    async def _read_frames(self):
+        try:
+            while True:
+                frame_type, payload = await _read_frame(self._reader)
+                if frame_type is None:
+                    break
+                self._handle_frame(frame_type, payload)
+        finally:
+            _fail_all(self._waiters, 'Connection is closed!')
+
+    async def detach(self):
+        if self.is_attached:
+            self._reader_task.cancel()
+            self._writer.close()
+
+
+@asynclshift
+class RemoteSender(_RemoteEndpoint):
+    __slots__ = ('_credit',)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._credit = self.buffer_size  # broker grants initial credit with hello
+
+    def _handle_frame(self, frame_type, payload):
+        if frame_type == _CREDIT:
+            self._credit += _U32.unpack(payload)[0]
+            _wakeup_next(self._waiters)
+
+    async def send(self, data):
+        await self.send_many((data,))
+
+    async def send_many(self, iterable):
+        encoded = [self._codec.encode(data) for data in iterable]
+        while encoded:
+            while not self._credit:
+                await self._wait()
+
+            count = min(self._credit, len(encoded))
+            self._credit -= count
+            self._writer.writelines(_batch_frame(encoded[:count]))
+            encoded = encoded[count:]
+            await self._writer.drain()
+
+        if self._credit:
+            _wakeup_next(self._waiters)
+
+    async def __alshift__(self, data):
+        await self.send(data)
+
+
+class RemoteGetter(_RemoteEndpoint, AsyncIterable):
+    __slots__ = ('_received', '_consumed')
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._received = deque()
+        self._consumed = 0
+        self._writer.write(_frame(_CREDIT, _U32.pack(self.buffer_size)))
+
+    def _handle_frame(self, frame_type, payload):
+        if frame_type == _DATA:
+            self._received.extend(_unpack_batch(payload))
+            _wakeup_next(self._waiters)
+
+    def _take(self, max_items):
+        batch = [self._received.popleft() for _ in range(min(max_items, len(self._received)))]
+        self._consumed += len(batch)
+        if self._consumed * 2 >= self.buffer_size:  # credits are returned in batches
+            self._writer.write(_frame(_CREDIT, _U32.pack(self._consumed)))
+            self._consumed = 0
+        if self._received:
+            _wakeup_next(self._waiters)
+        return [self._codec.decode(view) for view in batch]
+
+    async def get(self):
+        while not self._received:
+            await self._wait()
+        return self._take(1)[0]
+
+    async def get_many(self, max_items, timeout=None):
+        if max_items < 1:
+            raise ValueError('max_items should be positive!')
+
+        if not self._received:
+            await self._wait(timeout)
+        return self._take(max_items)
+
+    async def get_forever(self):
+        while self.is_attached or self._received:
+            yield await self.get()
+
+    async def __aiter__(self):
+        while self._received:
+            yield self._take(1)[0]
+
+
+async def _handshake(path, host, port, role):
+    reader, writer = await _open_connection(path, host, port)
+    writer.write(_frame(_HELLO, role))
+    frame_type, payload = await _read_frame(reader)
+    if frame_type != _HELLO:
+        writer.close()
+        raise ChannelError('Broker handshake failed!')
+    return reader, writer, _U32.unpack(payload)[0]
+
+
+async def connect_sender(*, path=None, host=None, port=None, serializer=None):
+    reader, writer, window = await _handshake(path, host, port, _SENDER_ROLE)
+    return RemoteSender(reader, writer, serializer, window)
+
+
+async def connect_getter(*, path=None, host=None, port=None, serializer=None):
+    reader, writer, window = await _handshake(path, host, port, _GETTER_ROLE)
+    return RemoteGetter(reader, writer, serializer, window)
+
+
+async def _serve_sender(channel, reader, writer, codec):
+    sender = await channel.new_sender()
+    try:
+        while True:
+            frame_type, payload = await _read_frame(reader)
+            if frame_type is None:
+                break
+            if frame_type == _DATA:
+                batch = _unpack_batch(payload)
+                if codec is not None:
+                    batch = [codec.decode(view) for view in batch]
+                else:  # channel messages are payloads
+                    batch = [bytes(view) for view in batch]
+                await sender.send_many(batch)
+                writer.write(_frame(_CREDIT, _U32.pack(len(batch))))
+    finally:
+        await sender.detach()
+
+
+async def _serve_getter(channel, reader, writer, codec):
+    getter = await channel.new_getter()
+    credit = 0  # messages remote getter is ready to receive
+    closed = False
+    waiters = deque()
+
+    async def read_credits():
+        nonlocal credit, closed
+        try:
+            while True:
+                frame_type, payload = await _read_frame(reader)
+                if frame_type is None:
+                    break
+                if frame_type == _CREDIT:
+                    credit += _U32.unpack(payload)[0]
+                    _wakeup_next(waiters)
+        finally:
+            closed = True
+            await getter.detach()  # stops pending get below
+            _fail_all(waiters, 'Connection is closed!')
+
+    credits_task = channel.loop.create_task(read_credits())
+    try:
+        while getter.is_attached:
+            while not credit:
+                waiter = channel.loop.create_future()
+                waiters.append(waiter)
+                await waiter
+
+            batch = await getter.get_many(credit)
+            if codec is not None:
+                encoded = [codec.encode(data) for data in batch]
+            else:
+                encoded = [(payload,) for payload in batch]
+            credit -= len(batch)
+            writer.writelines(_batch_frame(encoded))
+            await writer.drain()
+    except (asyncio.CancelledError, ChannelError):
+        if not closed:  # not stopped by remote getter disconnect
+            raise
+    finally:
+        credits_task.cancel()
+        await getter.detach()
+
+
+async def serve_channel(channel, *, path=None, host=None, port=None, serializer=None):
+    """
+    Starts serving channel and returns asyncio server.
+    With `serializer` (codec or module with `dumps`/`loads`) remote data is deserialized for channel,
+    otherwise channel messages are serialized payloads (bytes) which are passed between remote endpoints as is.
+    """
+    window = channel.buffer_size if channel.buffer_size > 0 else DEFAULT_WINDOW
+    codec = as_codec(serializer) if serializer is not None else None
+
+    async def handle_connection(reader, writer):
+        frame_type, role = await _read_frame(reader)
+        if frame_type != _HELLO or role not in (_SENDER_ROLE, _GETTER_ROLE):
+            writer.close()
+            return
+
+        writer.write(_frame(_HELLO, _U32.pack(window)))
+        try:
+            if role == _SENDER_ROLE:
+                await _serve_sender(channel, reader, writer, codec)
+            else:
+                await _serve_getter(channel, reader, writer, codec)
+        except (ConnectionError, ChannelError):
+            pass  # endpoint is disconnected or channel is closed
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # e.g. data which can't be decoded, only this connection is closed
+            _report_error(channel.loop, 'Exception in channel connection handler', e)
+        finally:
+            writer.close()
+
+    if path is not None:
+        return await asyncio.start_unix_server(handle_connection, path)
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve aiochannels Channel over a socket.')
+    parser.add_argument('--unix', help='unix domain socket path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--buffer-size', type=int, default=64)
+    parser.add_argument('--mode', default='broadcast')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        channel = await Channel(args.buffer_size, mode=args.mode)
+        server = await serve_channel(channel, path=args.unix, host=args.host, port=args.port)
+        print('Broker is ready', flush=True)
+        return server
+
+    loop = asyncio.get_event_loop()
+    server = loop.run_until_complete(serve())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Pipeline stages connect channels with worker tasks: every stage gets data from source channels,
+processes it and sends results into its own channel which can be a source of the next stage.
+Memory between stages is bounded by `buffer_size` of stage channels, so slow stages
+block previous ones instead of accumulating data.
+"""
+import asyncio
+import functools
+
+from .channel import Channel, ChannelError, _report_error
+
+_MERGE_BATCH = 256  # data forwarded at once from unlimited channel by merge
+
+
+class Stage:
+    """
+    Running stage, its results are sent into `channel`.
+    """
+    __slots__ = ('channel', '_getters', '_sender', '_tasks')
+
+    def __init__(self, channel, getters, sender):
+        self.channel = channel
+        self._getters = getters
+        self._sender = sender
+        self._tasks = []
+
+    def _start(self, coro):
+        task = self.channel.loop.create_task(coro)
+        task.add_done_callback(self._worker_done)
+        self._tasks.append(task)
+
+    def _worker_done(self, task):
+        # workers run until stage is closed or its channels are closed (ChannelError)
+        if task.cancelled() or isinstance(task.exception(), ChannelError):
+            return
+        _report_error(self.channel.loop, 'Pipeline stage worker stopped', task.exception())
+
+    async def close(self):
+        """
+        Stops stage workers and closes its channel, data being processed is lost.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for getter in self._getters:
+            await getter.detach()
+        await self._sender.detach()
+        self.channel.close()
+
+
+def _channel_of(source):
+    return source.channel if isinstance(source, Stage) else source
+
+
+async def _new_stage(sources, buffer_size):
+    channels = [_channel_of(source) for source in sources]
+    if buffer_size is None:
+        buffer_size = max(channel.buffer_size for channel in channels)
+
+    channel = await Channel(buffer_size)
+    getters = [await source.new_getter() for source in channels]
+    return Stage(channel, getters, await channel.new_sender())
+
+
+def _processor(loop, func, executor):
+    """
+    Returns function which starts processing of data and returns awaitable result.
+    """
+    if executor is not None:
+        return functools.partial(loop.run_in_executor, executor, func)
+    if asyncio.iscoroutinefunction(func):
+        return lambda data: loop.create_task(func(data))
+
+    def run_inline(data):
+        future = loop.create_future()
+        try:
+            future.set_result(func(data))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return run_inline
+
+
+def _run(stage, func, outputs, concurrency, executor, ordered):
+    if concurrency < 1:
+        raise ValueError('Stage concurrency should be positive!')
+
+    getter, sender, loop = stage._getters[0], stage._sender, stage.channel.loop
+    process = _processor(loop, func, executor)
+
+    async def emit(data, future):
+        try:
+            # flat_map results are iterated here, so their errors skip the data too
+            results = list(outputs(data, await future))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _report_error(loop, f'Exception in pipeline stage function {func!r}', e)
+            return
+        await sender.send_many(results)
+
+    async def worker():
+        while True:
+            data = await getter.get()
+            await emit(data, process(data))
+
+    async def read_ordered(slots, started):
+        while True:
+            await slots.acquire()
+            data = await getter.get()
+            started.put_nowait((data, process(data)))
+
+    async def write_ordered(slots, started):
+        while True:
+            data, future = await started.get()
+            await emit(data, future)
+            slots.release()
+
+    if ordered and concurrency > 1:
+        # in-flight data is bounded by `slots` and results are sent in order they were started
+        slots, started = asyncio.Semaphore(concurrency), asyncio.Queue()
+        stage._start(read_ordered(slots, started))
+        stage._start(write_ordered(slots, started))
+    else:
+        for _ in range(concurrency):
+            stage._start(worker())
+
+
+async def map(source, func, *, concurrency=1, executor=None, ordered=True, buffer_size=None):
+    """
+    Sends `func(data)` for every data of source channel (or stage). `func` can be async or
+    run in `executor` (thread or process pool), no more than `concurrency` data is processed at once.
+    With `ordered=False` results are sent as soon as they are ready.
+    """
+    stage = await _new_stage((source,), buffer_size)
+    _run(stage, func, lambda data, result: (result,), concurrency, executor, ordered)
+    return stage
+
+
+async def filter(source, func, *, concurrency=1, executor=None, ordered=True, buffer_size=None):
+    """
+    Sends data for which `func(data)` is true, arguments are the same as `map` ones.
+    """
+    stage = await _new_stage((source,), buffer_size)
+    _run(stage, func, lambda data, result: (data,) if result else (), concurrency, executor, ordered)
+    return stage
+
+
+async def flat_map(source, func, *, concurrency=1, executor=None, ordered=True, buffer_size=None):
+    """
+    Sends every item of iterable returned by `func(data)`, arguments are the same as `map` ones.
+    """
+    stage = await _new_stage((source,), buffer_size)
+    _run(stage, func, lambda data, result: result, concurrency, executor, ordered)
+    return stage
+
+
+async def batch(source, max_items, max_wait, *, buffer_size=None):
+    """
+    Sends lists of data collected with `Getter.get_batch`.
+    """
+    stage = await _new_stage((source,), buffer_size)
+    getter, sender = stage._getters[0], stage._sender
+
+    async def run():
+        while True:
+            await sender.send(await getter.get_batch(max_items, max_wait))
+
+    stage._start(run())
+    return stage
+
+
+async def merge(*sources, buffer_size=None):
+    """
+    Sends data of all source channels (or stages) into one channel.
+    """
+    stage = await _new_stage(sources, buffer_size)
+    sender = stage._sender
+    max_items = stage.channel.buffer_size or _MERGE_BATCH
+
+    async def forward(getter):
+        while True:
+            await sender.send_many(await getter.get_many(max_items))
+
+    for getter in stage._getters:
+        stage._start(forward(getter))
+    return stage
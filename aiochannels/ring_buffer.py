@@ -0,0 +1,83 @@
+class RingBuffer:
+    """
+    Fixed-size buffer shared by broadcast getters.
+    Every message is stored once and getters only move their own read cursors,
+    so writing doesn't depend on getters count. Writer should respect `free_space`
+    which is calculated by the slowest blocking reader.
+    """
+    __slots__ = ('size', 'head', 'readers', '_slots', '_tail')
+
+    class Reader:
+        """
+        Getter's read cursor. Supports `len` and `popleft` like a deque does.
+        Non-blocking readers are not waited for and lose overwritten data.
+        """
+        __slots__ = ('ring', 'cursor', 'blocking', 'dropped')
+
+        def __init__(self, ring, blocking):
+            self.ring = ring
+            self.cursor = ring.head
+            self.blocking = blocking
+            self.dropped = 0
+
+        def __len__(self):
+            ring = self.ring
+            lag = ring.head - self.cursor - ring.size
+            if lag > 0:  # data was overwritten
+                self.cursor += lag
+                self.dropped += lag
+            return ring.head - self.cursor
+
+        def popleft(self):
+            if not len(self):
+                raise IndexError('Pop from empty reader!')
+
+            data = self.ring._slots[self.cursor % self.ring.size]
+            self.cursor += 1
+            return data
+
+        def pop_many(self, max_items):
+            count = min(max_items, len(self))
+            slots, size = self.ring._slots, self.ring.size
+            start = self.cursor % size
+            end = start + count
+            if end <= size:
+                batch = slots[start:end]
+            else:
+                batch = slots[start:] + slots[:end - size]
+            self.cursor += count
+            return batch
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError('Ring buffer size should be positive!')
+
+        self.size = size
+        self.head = 0  # sequence number of the next written message
+        self.readers = set()
+        self._slots = [None] * size
+        self._tail = 0  # cached cursor of the slowest blocking reader
+
+    def reader(self, blocking=True):
+        reader = RingBuffer.Reader(self, blocking)
+        self.readers.add(reader)
+        return reader
+
+    def remove_reader(self, reader):
+        self.readers.discard(reader)
+
+    def free_space(self):
+        # cached tail can only be behind the real one so it's recalculated lazily
+        free = self.size - (self.head - self._tail)
+        if free <= 0:
+            self._tail = min((r.cursor for r in self.readers if r.blocking), default=self.head)
+            free = self.size - (self.head - self._tail)
+        return free
+
+    def extend(self, batch):
+        slots, size = self._slots, self.size
+        head = self.head
+        for data in batch:
+            slots[head % size] = data
+            head += 1
+        self.head = head
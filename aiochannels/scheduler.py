@@ -0,0 +1,80 @@
+from heapq import heappush, heappop, heapify
+from collections import deque
+
+
+class SenderScheduler:
+    """
+    Ready senders queue for channels with prioritized or weighted senders.
+    It has the part of `deque` interface used by channel loop (`append`, `popleft`, `remove`, `len`).
+
+    Senders with higher priority are served first. Senders of the same priority share the channel
+    in proportion to their weights (start-time fair queueing, every sender is charged by the number
+    of messages channel took from it). Sender which waits longer than `starvation_limit` turns
+    of other senders is served regardless of its priority. Every operation is O(log senders).
+    """
+    __slots__ = ('starvation_limit', '_heap', '_arrivals', '_entries', '_vtime', '_turns', '_seq')
+
+    def __init__(self, senders=(), starvation_limit=64):
+        self.starvation_limit = starvation_limit
+        self._heap = []  # (-priority, virtual start time, seq, sender)
+        self._arrivals = deque()  # (turn when sender became ready, seq, sender)
+        self._entries = {}  # sender -> seq of its actual entries, other entries are stale
+        self._vtime = 0.0  # virtual time of the last served sender
+        self._turns = 0
+        self._seq = 0
+        for sender in senders:
+            self.append(sender)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, sender):
+        served = sender._taken - sender._charged
+        sender._charged = sender._taken
+        # sender which was idle doesn't save up its share
+        sender._vstart = max(self._vtime, sender._vstart + served / sender.weight)
+
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+        self._seq += 1
+        self._entries[sender] = self._seq
+        heappush(self._heap, (-sender.priority, sender._vstart, self._seq, sender))
+        self._arrivals.append((self._turns, self._seq, sender))
+
+    def _compact(self):
+        """
+        Drops stale entries left by removed senders and senders served because of starvation.
+        """
+        self._heap = [entry for entry in self._heap if self._is_actual(entry[2], entry[3])]
+        heapify(self._heap)
+        self._arrivals = deque(entry for entry in self._arrivals if self._is_actual(entry[1], entry[2]))
+
+    def _is_actual(self, seq, sender):
+        return self._entries.get(sender) == seq
+
+    def popleft(self):
+        if not self._entries:
+            raise IndexError('pop from an empty scheduler')
+
+        self._turns += 1
+        arrivals = self._arrivals
+        while not self._is_actual(arrivals[0][1], arrivals[0][2]):
+            arrivals.popleft()
+
+        if self._turns - arrivals[0][0] > self.starvation_limit:
+            _, _, sender = arrivals.popleft()
+        else:
+            heap = self._heap
+            while not self._is_actual(heap[0][2], heap[0][3]):
+                heappop(heap)
+            _, self._vtime, _, sender = heappop(heap)
+
+        del self._entries[sender]
+        return sender
+
+    def remove(self, sender):
+        try:
+            del self._entries[sender]  # entries are removed lazily
+        except KeyError:
+            raise ValueError('Sender is not in scheduler!') from None
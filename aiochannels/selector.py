@@ -0,0 +1,113 @@
+import asyncio
+
+from .channel import Channel, _SharedWaiter, _wakeup_next, _release_waiter
+
+_NO_DEFAULT = object()
+
+
+def _parse_case(case):
+    if isinstance(case, Channel.Getter):
+        return case, None
+
+    if isinstance(case, tuple) and len(case) == 2 and isinstance(case[0], Channel.Sender):
+        return case
+
+    raise TypeError('Getter or (Sender, data) tuple is expected!')
+
+
+def _is_ready(endpoint):
+    if isinstance(endpoint, Channel.Getter):
+        return bool(endpoint._received_queue)
+    return not endpoint._full()
+
+
+def _try_complete(endpoint, data):
+    if isinstance(endpoint, Channel.Getter):
+        if endpoint._received_queue:
+            return True, endpoint._get_nowait()
+    elif not endpoint._full():
+        endpoint._send_nowait(data)
+        return True, data
+
+    return False, None
+
+
+def _waiters_of(endpoint):
+    return endpoint._waiters if isinstance(endpoint, Channel.Getter) else endpoint._putters
+
+
+def _pass_wakeups(cases, skip=None):
+    """
+    Wakeup could be consumed by select for a case which wasn't completed,
+    so it's passed to other waiters of ready endpoints.
+    """
+    for endpoint, _ in cases:
+        if endpoint is not skip and _is_ready(endpoint):
+            _wakeup_next(_waiters_of(endpoint))
+
+
+async def select(*cases, timeout=None, default=_NO_DEFAULT):
+    """
+    Go-like select. Waits until one of cases can be completed and completes only this one.
+    Case is either a Getter (receive) or a (Sender, data) tuple (send), endpoints could
+    belong to different channels. Ready cases are checked in passed order.
+
+    Returns (endpoint, data) tuple where data is received or sent data.
+    If nothing is ready and `default` is passed returns (None, default) without waiting.
+    Raises asyncio.TimeoutError if nothing was completed before timeout
+    and ChannelError if endpoint of a case is detached while select waits.
+    """
+    if not cases:
+        raise ValueError('At least one case is expected!')
+
+    cases = [_parse_case(case) for case in cases]
+    loop = cases[0][0].channel.loop
+    deadline = None if timeout is None else loop.time() + timeout
+    woken = False
+
+    while True:
+        for endpoint, _ in cases:
+            if isinstance(endpoint, Channel.Getter):
+                endpoint._demand()
+
+        for endpoint, data in cases:
+            completed, result = _try_complete(endpoint, data)
+            if completed:
+                if woken:
+                    _pass_wakeups(cases, skip=endpoint)
+                endpoint.channel._raise_if_stopped()
+                return endpoint, result
+
+        if default is not _NO_DEFAULT:
+            return None, default
+
+        if deadline is not None and loop.time() >= deadline:
+            raise asyncio.TimeoutError()
+
+        # one waiter is registered right in every endpoint, so no task is created per case
+        waiter = _SharedWaiter(loop=loop)
+        for endpoint, _ in cases:
+            if isinstance(endpoint, Channel.Getter):
+                endpoint._add_waiter(waiter)
+            else:
+                endpoint._putters.append(waiter)
+
+        timer = None if deadline is None else loop.call_at(deadline, _release_waiter, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            waiter.cancel()  # select itself could be cancelled
+            if not waiter.cancelled():
+                _pass_wakeups(cases)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+            for endpoint, _ in cases:
+                try:
+                    _waiters_of(endpoint).remove(waiter)
+                except ValueError:
+                    pass
+
+        woken = True
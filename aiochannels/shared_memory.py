@@ -0,0 +1,371 @@
+import asyncio
+import socket
+import struct
+import multiprocessing
+
+from array import array
+from collections import AsyncIterable
+from multiprocessing import shared_memory, resource_tracker
+
+from .channel import ChannelError
+from .codecs import as_codec
+from .utils import asynclshift
+
+# Shared memory starts with a table of 8 byte words: header (write position, data capacity,
+# max endpoints count, used slots count) and endpoint slots (kind, waiting flag, read position).
+_HEADER = struct.Struct('=4Q')
+_HEADER_WORDS, _SLOT_WORDS = 4, 3
+_WRITE_POS, _SLOTS_USED = 0, 3
+_LENGTH = struct.Struct('=I')
+
+_FREE, _GETTER, _SENDER = 0, 1, 2
+
+
+class _Doorbell:
+    """
+    Wakes up endpoint awaiting in another process. It's an abstract unix datagram socket
+    (Linux only) named by shared memory name and endpoint slot, so no file descriptors
+    should be passed between processes.
+    """
+    __slots__ = ('loop', 'address', 'sock', '_waiter')
+
+    def __init__(self, loop, address):
+        self.loop = loop
+        self.address = address
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(address)
+        self._waiter = None
+        loop.add_reader(self.sock.fileno(), self._on_ring)
+
+    def _on_ring(self):
+        try:
+            while self.sock.recv(16):
+                pass
+        except BlockingIOError:
+            pass
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def ring(self, address):
+        try:
+            self.sock.sendto(b'\0', address)
+        except OSError:  # endpoint is gone or it already has unread ring
+            pass
+
+    async def wait(self, timeout=None):
+        self._waiter = self.loop.create_future()
+        timer = None if timeout is None else self.loop.call_later(timeout, self._on_ring)
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+            if timer is not None:
+                timer.cancel()
+
+    def cancel(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.cancel()
+
+    def close(self):
+        self.cancel()
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+class SharedMemoryChannel:
+    """
+    Channel which senders and getters could be in different processes.
+    Messages are serialized into a ring buffer in shared memory, every getter has its own
+    read position so every getter receives all messages sent after it was attached.
+    Senders wait for the slowest getter, so with no getters sent data is dropped.
+
+    Pass channel to other processes as `multiprocessing.Process` argument (lock is shared by
+    inheritance), then create endpoints there. Serializer should be a codec or have `dumps` and
+    `loads` methods and be picklable, `PickleCodec` is used by default.
+    """
+
+    class _Endpoint:
+        __slots__ = ('channel', 'slot', '_doorbell')
+
+        def __init__(self, channel):
+            self.channel = channel
+            self.slot = None
+            self._doorbell = None
+
+        @property
+        def is_attached(self):
+            return self.slot is not None
+
+        async def attach(self):
+            if not self.is_attached:
+                self.slot = self.channel._claim_slot(self._kind)
+                self._doorbell = _Doorbell(asyncio.get_event_loop(), self.channel._address(self.slot))
+
+        async def detach(self):
+            if self.is_attached:
+                to_wakeup = self.channel._release_slot(self.slot)
+                self._ring(to_wakeup)  # released getter could be the slowest one
+                self._doorbell.close()
+                self.slot = self._doorbell = None
+
+        async def _wait(self, timeout=None):
+            if not self.is_attached:
+                raise ChannelError('Endpoint is detached!')
+            await self._doorbell.wait(timeout)
+
+        def _ring(self, slots):
+            for slot in slots:
+                self._doorbell.ring(self.channel._address(slot))
+
+    @asynclshift
+    class Sender(_Endpoint):
+        __slots__ = ()
+        _kind = _SENDER
+
+        async def send(self, data):
+            await self._write([self.channel._codec.encode(data)])
+
+        async def send_many(self, iterable):
+            await self._write([self.channel._codec.encode(data) for data in iterable])
+
+        async def _write(self, encoded):
+            # codec segments are copied into shared memory one by one without joining them
+            payloads = [(sum(len(segment) for segment in segments), segments) for segments in encoded]
+            for size, _ in payloads:
+                if size + _LENGTH.size > self.channel.capacity:
+                    raise ValueError(f'Message of {size} bytes is bigger than channel capacity!')
+
+            while payloads:
+                if not self.is_attached:
+                    raise ChannelError('Sender is detached!')
+
+                with self.channel._lock:
+                    written, to_wakeup = self.channel._write(payloads, self.slot)
+                self._ring(to_wakeup)
+
+                payloads = payloads[written:]
+                if payloads:
+                    await self._wait()
+
+        async def __alshift__(self, data):
+            await self.send(data)
+
+    class Getter(_Endpoint, AsyncIterable):
+        __slots__ = ()
+        _kind = _GETTER
+
+        async def _read(self, max_items, timeout=None):
+            loop = asyncio.get_event_loop()
+            deadline = None if timeout is None else loop.time() + timeout
+            while True:
+                if not self.is_attached:
+                    raise ChannelError('Getter is detached!')
+
+                channel = self.channel
+                with channel._lock:
+                    spans = channel._read(max_items, self.slot)
+
+                if spans:
+                    # senders don't overwrite data until getter position is moved, so it's decoded
+                    # right from shared memory without holding the lock
+                    try:
+                        return [channel._decode(pos, size) for pos, size in spans]
+                    finally:
+                        end_pos, size = spans[-1]
+                        with channel._lock:
+                            to_wakeup = channel._move(self.slot, end_pos + size)
+                        self._ring(to_wakeup)
+
+                if deadline is not None:
+                    if loop.time() >= deadline:
+                        return []
+                    await self._wait(deadline - loop.time())
+                else:
+                    await self._wait()
+
+        async def get(self):
+            return (await self._read(1))[0]
+
+        async def get_many(self, max_items, timeout=None):
+            if max_items < 1:
+                raise ValueError('max_items should be positive!')
+            return await self._read(max_items, timeout)
+
+        async def get_forever(self):
+            while self.is_attached:
+                yield await self.get()
+
+        async def __aiter__(self):
+            while True:
+                batch = await self._read(1, timeout=0)
+                if not batch:
+                    break
+                yield batch[0]
+
+    def __init__(self, size=1 << 20, *, serializer=None, max_endpoints=64):
+        self._serializer_arg = serializer
+        self._codec = as_codec(serializer)
+        self._lock = multiprocessing.Lock()
+
+        header_words = _HEADER_WORDS + _SLOT_WORDS * max_endpoints
+        self._shm = shared_memory.SharedMemory(create=True, size=header_words * 8 + size)
+        _HEADER.pack_into(self._shm.buf, 0, 0, size, max_endpoints, 0)
+        self._setup()
+
+    def _setup(self):
+        self.name = self._shm.name
+        _, self.capacity, self.max_endpoints, _ = _HEADER.unpack_from(self._shm.buf, 0)
+        self._data_offset = (_HEADER_WORDS + _SLOT_WORDS * self.max_endpoints) * 8
+        self._words = self._shm.buf[:self._data_offset].cast('Q')
+
+    def __getstate__(self):
+        return self._shm.name, self._serializer_arg, self._lock
+
+    def __setstate__(self, state):
+        name, self._serializer_arg, self._lock = state
+        self._codec = as_codec(self._serializer_arg)
+        self._shm = shared_memory.SharedMemory(name=name)
+        # only process which created shared memory should unlink it
+        resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self._setup()
+
+    async def new_sender(self):
+        sender = SharedMemoryChannel.Sender(self)
+        await sender.attach()
+        return sender
+
+    async def new_getter(self):
+        getter = SharedMemoryChannel.Getter(self)
+        await getter.attach()
+        return getter
+
+    def close(self):
+        self._words.release()
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def _address(self, slot):
+        return f'\0aiochannels-{self.name}-{slot}'
+
+    def _claim_slot(self, kind):
+        words = self._words
+        with self._lock:
+            for slot in range(self.max_endpoints):
+                ix = _HEADER_WORDS + _SLOT_WORDS * slot
+                if words[ix] == _FREE:
+                    words[ix:ix + _SLOT_WORDS] = array('Q', (kind, 0, words[_WRITE_POS]))
+                    words[_SLOTS_USED] = max(words[_SLOTS_USED], slot + 1)
+                    return slot
+
+        raise ChannelError('Too many endpoints!')
+
+    def _release_slot(self, slot):
+        with self._lock:
+            self._words[_HEADER_WORDS + _SLOT_WORDS * slot] = _FREE
+            return self._waiting(_SENDER)
+
+    # Methods below should be called with acquired lock
+
+    def _waiting(self, kind):
+        """
+        Returns slots of endpoints waiting for a ring and resets their waiting flags.
+        """
+        words, slots = self._words, []
+        for slot in range(words[_SLOTS_USED]):
+            ix = _HEADER_WORDS + _SLOT_WORDS * slot
+            if words[ix] == kind and words[ix + 1]:
+                words[ix + 1] = 0
+                slots.append(slot)
+        return slots
+
+    def _copy_in(self, pos, data):
+        data = memoryview(data)  # slices of views aren't copies
+        start = pos % self.capacity
+        first = min(len(data), self.capacity - start)
+        offset = self._data_offset
+        self._shm.buf[offset + start:offset + start + first] = data[:first]
+        if first < len(data):
+            self._shm.buf[offset:offset + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos, size):
+        start = pos % self.capacity
+        first = min(size, self.capacity - start)
+        offset = self._data_offset
+        data = bytearray(size)
+        data[:first] = self._shm.buf[offset + start:offset + start + first]
+        if first < size:
+            data[first:] = self._shm.buf[offset:offset + size - first]
+        return data
+
+    def _write(self, payloads, slot):
+        words = self._words
+        write_pos = tail = words[_WRITE_POS]
+        for getter_slot in range(words[_SLOTS_USED]):
+            ix = _HEADER_WORDS + _SLOT_WORDS * getter_slot
+            if words[ix] == _GETTER and words[ix + 2] < tail:
+                tail = words[ix + 2]
+
+        free = self.capacity - (write_pos - tail)
+        written = 0
+        for length, segments in payloads:
+            size = _LENGTH.size + length
+            if size > free:
+                break
+            self._copy_in(write_pos, _LENGTH.pack(length))
+            pos = write_pos + _LENGTH.size
+            for segment in segments:
+                self._copy_in(pos, segment)
+                pos += len(segment)
+            write_pos += size
+            free -= size
+            written += 1
+
+        if written < len(payloads):  # sender will wait for getters to free space
+            words[_HEADER_WORDS + _SLOT_WORDS * slot + 1] = 1
+        if not written:
+            return 0, []
+
+        words[_WRITE_POS] = write_pos
+        return written, self._waiting(_GETTER)
+
+    def _read(self, max_items, slot):
+        """
+        Returns (position, size) of up to max_items unread payloads, getter position isn't moved.
+        """
+        words = self._words
+        write_pos = words[_WRITE_POS]
+        ix = _HEADER_WORDS + _SLOT_WORDS * slot
+        pos = words[ix + 2]
+
+        spans = []
+        while pos < write_pos and len(spans) < max_items:
+            size = _LENGTH.unpack(self._copy_out(pos, _LENGTH.size))[0]
+            spans.append((pos + _LENGTH.size, size))
+            pos += _LENGTH.size + size
+
+        if not spans:
+            words[ix + 1] = 1  # getter will wait for senders
+        return spans
+
+    def _decode(self, pos, size):
+        start, offset = pos % self.capacity, self._data_offset
+        first = min(size, self.capacity - start)
+        segments = [self._shm.buf[offset + start:offset + start + first]]
+        if first < size:  # payload wraps around the end of ring
+            segments.append(self._shm.buf[offset:offset + size - first])
+        try:
+            return self._codec.decode_copy(segments)
+        finally:
+            for segment in segments:  # shared memory can't be closed while its views exist
+                segment.release()
+
+    def _move(self, slot, pos):
+        """
+        Moves getter position past read payloads and returns senders waiting for free space.
+        """
+        self._words[_HEADER_WORDS + _SLOT_WORDS * slot + 2] = pos
+        return self._waiting(_SENDER)
@@ -0,0 +1,86 @@
+"""
+Channel topologies: every sender sends its share of messages, every getter receives all of them.
+Messages carry send timestamp, so each received message gives a latency sample.
+Idle endpoints are attached but don't send or receive (idle getters drop overflowing data).
+"""
+import asyncio
+import itertools
+
+from time import perf_counter
+
+from aiochannels import Channel
+
+from common import result
+
+TOPOLOGIES = ((1, 1), (4, 1), (1, 4), (4, 4))
+
+
+async def topology(senders_count, getters_count, *, messages, buffer_size, payload_size=16,
+                   idle_endpoints=0, batch_size=1, mode='broadcast'):
+    ch = await Channel(buffer_size, mode=mode)
+    senders = await ch.new_senders(senders_count)
+    getters = await ch.new_getters(getters_count)
+    idle_senders = await ch.new_senders(idle_endpoints)
+    idle_getters = await ch.new_getters(idle_endpoints, overflow='drop_oldest')
+
+    payload = bytes(payload_size)
+    per_sender = messages // senders_count
+    expected = per_sender * senders_count
+    latencies = []
+
+    async def produce(sender):
+        if batch_size == 1:
+            for _ in range(per_sender):
+                await sender.send((perf_counter(), payload))
+        else:
+            for sent in range(0, per_sender, batch_size):
+                now = perf_counter()
+                await sender.send_many((now, payload) for _ in range(min(batch_size, per_sender - sent)))
+
+    async def consume(getter):
+        received = 0
+        while received < expected:
+            batch = await getter.get_many(batch_size)
+            now = perf_counter()
+            latencies.extend(now - sent_at for sent_at, _ in batch)
+            received += len(batch)
+
+    start = perf_counter()
+    tasks = [ch.loop.create_task(consume(getter)) for getter in getters]
+    tasks.extend(ch.loop.create_task(produce(sender)) for sender in senders)
+    await asyncio.gather(*tasks)
+    elapsed = perf_counter() - start
+
+    for endpoint in itertools.chain(senders, getters, idle_senders, idle_getters):
+        await endpoint.detach()
+    ch.close()
+    return expected, elapsed, latencies
+
+
+def cases(quick=False, messages=20000):
+    buffer_sizes = (1, 256) if quick else (1, 16, 256)
+    payload_sizes = (16,) if quick else (16, 4096)
+    idle_counts = (0,) if quick else (0, 100)
+
+    for (senders, getters), buffer_size, payload_size, idle in itertools.product(
+            TOPOLOGIES, buffer_sizes, payload_sizes, idle_counts):
+        params = dict(senders=senders, getters=getters, buffer_size=buffer_size,
+                      payload_size=payload_size, idle_endpoints=idle)
+        yield _case(params, messages)
+
+    for mode, batch_size in itertools.product(('broadcast', 'ring'), (1, 64)):
+        params = dict(senders=1, getters=50, buffer_size=256, payload_size=16,
+                      idle_endpoints=0, batch_size=batch_size, mode=mode)
+        yield _case(params, messages // 10)
+
+
+def _case(params, messages):
+    options = dict(params)
+    senders, getters = options.pop('senders'), options.pop('getters')
+    name = f'{senders}->{getters} ' + ' '.join(f'{key}={value}' for key, value in options.items())
+
+    async def run():
+        ops, elapsed, latencies = await topology(senders, getters, messages=messages, **options)
+        # throughput counts sent messages, every getter receives all of them
+        return result('channel', name, params, ops, elapsed, latencies)
+    return name, run
@@ -0,0 +1,103 @@
+"""
+Codecs encode/decode and transport round trips of a large buffer.
+`copies` is peak memory allocated per message divided by payload size (tracemalloc),
+so zero-copy paths report values close to 0 and every extra copy adds about 1.
+"""
+import time
+import pickle
+import tracemalloc
+
+from aiochannels.codecs import PickleCodec, RawCodec, CompactCodec, SerializerCodec
+
+from common import result
+
+try:
+    from aiochannels import SharedMemoryChannel
+except ImportError:  # shared memory requires python 3.8+
+    SharedMemoryChannel = None
+
+CODECS = (
+    ('pickle serializer', SerializerCodec(pickle)),
+    ('PickleCodec', PickleCodec()),
+    ('RawCodec', RawCodec()),
+    ('CompactCodec', CompactCodec()),
+)
+
+
+def _measure(round_trip, payload, messages):
+    round_trip(payload)  # warm up
+    latencies = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(messages):
+        t = time.perf_counter()
+        round_trip(payload)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, latencies, peak / len(payload)
+
+
+def _codec_round_trip(codec):
+    def round_trip(payload):
+        segments = codec.encode(payload)
+        # decoding from one received buffer like transports do
+        view = memoryview(segments[0] if len(segments) == 1 else b''.join(segments))
+        return codec.decode(view)
+    return round_trip
+
+
+async def _shared_memory_round_trip(codec, payload, messages):
+    ch = SharedMemoryChannel(4 * len(payload), serializer=codec)
+    sender, getter = await ch.new_sender(), await ch.new_getter()
+    await sender.send(payload)  # warm up
+    await getter.get()
+
+    latencies = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(messages):
+        t = time.perf_counter()
+        await sender.send(payload)
+        await getter.get()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await sender.detach()
+    await getter.detach()
+    ch.close()
+    ch.unlink()
+    return elapsed, latencies, peak / len(payload)
+
+
+def cases(quick=False, messages=20000):
+    messages = max(10, messages // 1000)
+    sizes = (1 << 20,) if quick else (64 << 10, 1 << 20, 16 << 20)
+    for size in sizes:
+        for name, codec in CODECS:
+            yield f'{name} encode/decode size={size}', _codec_case(name, codec, size, messages)
+        if SharedMemoryChannel is None:  # shared memory requires python 3.8+
+            continue
+        for name, codec in CODECS[:3]:
+            yield f'{name} shared memory size={size}', _shared_memory_case(name, codec, size, messages)
+
+
+def _codec_case(name, codec, size, messages):
+    async def run():
+        # bytes for CompactCodec which doesn't keep bytearray type
+        payload = bytes(size) if isinstance(codec, CompactCodec) else bytearray(size)
+        elapsed, latencies, copies = _measure(_codec_round_trip(codec), payload, messages)
+        return result('codecs', f'{name} encode/decode size={size}', dict(codec=name, transport=None, size=size),
+                      messages, elapsed, latencies, copies=copies)
+    return run
+
+
+def _shared_memory_case(name, codec, size, messages):
+    async def run():
+        elapsed, latencies, copies = await _shared_memory_round_trip(codec, bytearray(size), messages)
+        return result('codecs', f'{name} shared memory size={size}', dict(codec=name, transport='shared_memory',
+                      size=size), messages, elapsed, latencies, copies=copies)
+    return run
@@ -0,0 +1,73 @@
+"""
+AiterableDeque operations on deques of different sizes.
+"""
+import random
+import itertools
+
+from time import perf_counter
+
+from aiochannels import AiterableDeque
+
+from common import result
+
+LOOKUPS = 10000
+
+
+async def append(size):
+    dq = await AiterableDeque()
+    start = perf_counter()
+    for i in range(size):
+        await dq.append(i)
+    return size, perf_counter() - start
+
+
+async def pop(size):
+    dq = await AiterableDeque(range(size))
+    start = perf_counter()
+    for _ in range(size):
+        await dq.pop()
+    return size, perf_counter() - start
+
+
+async def getitem(size):
+    dq = await AiterableDeque(range(size))
+    indexes = [random.randrange(size) for _ in range(LOOKUPS)]
+    start = perf_counter()
+    for ix in indexes:
+        await dq[ix]
+    return LOOKUPS, perf_counter() - start
+
+
+async def remove(size, indexed):
+    dq = await AiterableDeque(range(size), indexed=indexed)
+    count = min(size, 1000 if indexed else 100)  # not indexed remove scans the deque
+    values = random.sample(range(size), count)
+    start = perf_counter()
+    for val in values:
+        await dq.remove(val)
+    return count, perf_counter() - start
+
+
+OPERATIONS = {
+    'append': append,
+    'pop': pop,
+    'getitem': getitem,
+    'remove': lambda size: remove(size, indexed=False),
+    'remove_indexed': lambda size: remove(size, indexed=True),
+}
+
+
+def cases(quick=False, messages=None):
+    sizes = (1000, 10000) if quick else (1000, 10000, 100000)
+    for (operation, bench), size in itertools.product(OPERATIONS.items(), sizes):
+        yield _case(dict(operation=operation, size=size), bench)
+
+
+def _case(params, bench):
+    name = f'{params["operation"]} size={params["size"]}'
+
+    async def run():
+        random.seed(0)
+        ops, elapsed = await bench(params['size'])
+        return result('deque', name, params, ops, elapsed)
+    return name, run
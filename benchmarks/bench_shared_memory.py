@@ -0,0 +1,78 @@
+"""
+SharedMemoryChannel vs multiprocessing.Queue bridged with executor.
+Child process sends (index, timestamp) tuples, event loop of main process receives them.
+"""
+import time
+import asyncio
+import multiprocessing
+
+from aiochannels import SharedMemoryChannel
+
+from common import result
+
+
+def shm_producer(ch, messages):
+    async def produce():
+        sender = await ch.new_sender()
+        for i in range(messages):
+            await sender.send((i, time.perf_counter()))
+        await sender.detach()
+
+    asyncio.new_event_loop().run_until_complete(produce())
+    ch.close()
+
+
+def queue_producer(queue, messages):
+    for i in range(messages):
+        queue.put((i, time.perf_counter()))
+
+
+async def bench_shared_memory(messages):
+    loop = asyncio.get_event_loop()
+    ch = SharedMemoryChannel(1 << 20)
+    getter = await ch.new_getter()
+    process = multiprocessing.Process(target=shm_producer, args=(ch, messages))
+
+    latencies = []
+    start = time.perf_counter()
+    process.start()
+    while len(latencies) < messages:
+        for _, sent_at in await getter.get_many(1024):
+            latencies.append(time.perf_counter() - sent_at)
+    elapsed = time.perf_counter() - start
+
+    await loop.run_in_executor(None, process.join)
+    await getter.detach()
+    ch.close()
+    ch.unlink()
+    return messages, elapsed, latencies
+
+
+async def bench_queue(messages):
+    loop = asyncio.get_event_loop()
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=queue_producer, args=(queue, messages))
+
+    latencies = []
+    start = time.perf_counter()
+    process.start()
+    while len(latencies) < messages:
+        _, sent_at = await loop.run_in_executor(None, queue.get)
+        latencies.append(time.perf_counter() - sent_at)
+    elapsed = time.perf_counter() - start
+
+    await loop.run_in_executor(None, process.join)
+    return messages, elapsed, latencies
+
+
+def cases(quick=False, messages=20000):
+    for transport, bench in (('SharedMemoryChannel', bench_shared_memory),
+                             ('multiprocessing.Queue + executor', bench_queue)):
+        yield transport, _case(transport, bench, messages)
+
+
+def _case(transport, bench, messages):
+    async def run():
+        ops, elapsed, latencies = await bench(messages)
+        return result('shared_memory', transport, dict(transport=transport), ops, elapsed, latencies)
+    return run
@@ -0,0 +1,23 @@
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def result(suite, name, params, ops, elapsed, latencies=None, **extra):
+    """
+    Benchmark result record, `ops_per_sec` is higher-is-better and latencies (seconds) are lower-is-better.
+    """
+    record = {
+        'suite': suite,
+        'name': name,
+        'params': params,
+        'ops': ops,
+        'elapsed': elapsed,
+        'ops_per_sec': ops / elapsed if elapsed else None,
+        'p50': percentile(latencies, 50) if latencies else None,
+        'p99': percentile(latencies, 99) if latencies else None,
+    }
+    record.update(extra)
+    return record
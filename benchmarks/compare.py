@@ -0,0 +1,60 @@
+"""
+Compares two results files of `benchmarks/run.py`.
+
+    python benchmarks/compare.py old.json new.json [--threshold 10]
+
+Exits with status 1 if throughput or p99 latency of any case regressed more than threshold percent.
+"""
+import sys
+import json
+import argparse
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data['environment'], {(r['suite'], r['name']): r for r in data['results']}
+
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare aiochannels benchmark results.')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10, help='regression threshold, percent')
+    args = parser.parse_args(argv)
+
+    old_env, old = load(args.old)
+    new_env, new = load(args.new)
+    print(f'old: {old_env.get("commit")} python {old_env.get("python")}')
+    print(f'new: {new_env.get("commit")} python {new_env.get("python")}')
+
+    regressions = []
+    for key in [key for key in new if key in old]:
+        ops_change = change(old[key].get('ops_per_sec'), new[key].get('ops_per_sec'))
+        p99_change = change(old[key].get('p99'), new[key].get('p99'))
+        regressed = (ops_change is not None and ops_change < -args.threshold
+                     or p99_change is not None and p99_change > args.threshold)
+        if regressed:
+            regressions.append(key)
+
+        line = f'{key[0]:>13} | {key[1]:<70} | ops/sec '
+        line += 'n/a' if ops_change is None else f'{ops_change:+7.1f}%'
+        if p99_change is not None:
+            line += f' | p99 {p99_change:+7.1f}%'
+        print(line + (' REGRESSION' if regressed else ''))
+
+    for key in sorted(old.keys() - new.keys()):
+        print(f'{key[0]:>13} | {key[1]:<70} | missing in new results')
+
+    print(f'{len(regressions)} regression(s) above {args.threshold}%')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
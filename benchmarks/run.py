@@ -0,0 +1,84 @@
+"""
+Runs benchmark suites and saves machine-readable results.
+
+    python benchmarks/run.py [--quick] [--suite channel] [--filter '1->1'] [--output results.json]
+    python benchmarks/compare.py old.json new.json
+
+Every case is run `--repeat` times and the run with the best throughput is kept.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import importlib
+import subprocess
+
+SUITES = ('channel', 'deque', 'shared_memory', 'codecs')
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'commit': commit or None,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def format_result(record):
+    line = f'{record["suite"]:>13} | {record["name"]:<70} | {record["ops_per_sec"]:>14,.0f} ops/sec'
+    if record['p50'] is not None:
+        line += f' | p50 {record["p50"] * 1e6:>9,.0f} us | p99 {record["p99"] * 1e6:>9,.0f} us'
+    if record.get('copies') is not None:
+        line += f' | {record["copies"]:.2f} copies'
+    return line
+
+
+async def run(suites, quick, messages, repeat, name_filter):
+    results = []
+    for suite in suites:
+        try:
+            module = importlib.import_module(f'bench_{suite}')
+        except ImportError as e:  # e.g. shared memory requires python 3.8+
+            print(f'Suite {suite!r} is skipped: {e}', file=sys.stderr)
+            continue
+
+        for name, case in module.cases(quick=quick, messages=messages):
+            if name_filter and name_filter not in name:
+                continue
+            records = [await case() for _ in range(repeat)]
+            record = max(records, key=lambda r: r['ops_per_sec'])
+            print(format_result(record), flush=True)
+            results.append(record)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run aiochannels benchmarks.')
+    parser.add_argument('--suite', action='append', choices=SUITES, help='suite to run (all by default)')
+    parser.add_argument('--filter', help='run only cases which name contains this string')
+    parser.add_argument('--quick', action='store_true', help='smaller sweep')
+    parser.add_argument('--messages', type=int, default=20000, help='messages per channel case')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help='json file for results')
+    args = parser.parse_args(argv)
+
+    loop = asyncio.get_event_loop()
+    results = loop.run_until_complete(run(args.suite or SUITES, args.quick, args.messages, args.repeat, args.filter))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=1)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -88,3 +88,121 @@ async def test_insert_while_iterating():
         test_deque.insert(4, val)
 
     assert list(test_deque) == await q.flattern()
+
+
+@async_test
+async def test_indexed_access():
+    from random import randrange, seed
+    seed(0)
+    test_list = list(range(1000))
+    q = await AiterableDeque(test_list)
+
+    for _ in range(3000):
+        op = randrange(5)
+        if op == 0:
+            ix, val = randrange(len(test_list) + 1), random()
+            test_list.insert(ix, val)
+            await q.insert(ix, val)
+        elif op == 1 and test_list:
+            val = test_list[randrange(len(test_list))]
+            test_list.remove(val)
+            await q.remove(val)
+        elif op == 2 and test_list:
+            assert test_list.pop() == await q.pop()
+        elif op == 3:
+            test_list.insert(0, op)
+            await q.appendleft(op)
+        elif test_list:
+            ix = randrange(-len(test_list), len(test_list))
+            assert await q[ix] == test_list[ix]
+
+    assert len(q) == len(test_list)
+    assert await q.flattern() == test_list
+    assert [await q[ix] for ix in range(len(q))] == test_list
+
+    with pytest.raises(IndexError):
+        await q[len(q)]
+
+
+@pytest.mark.parametrize('indexed', [False, True])
+@async_test
+async def test_value_index(indexed):
+    q = await AiterableDeque(['a', 'b', 'a', 'c', 'a'], indexed=indexed)
+    await q.insert(0, 'c')
+
+    assert q.count('a') == 3 and q.count('d') == 0
+    assert 'c' in q and 'd' not in q
+
+    await q.remove('c')  # first occurrence only
+    assert await q.flattern() == ['a', 'b', 'a', 'c', 'a']
+
+    assert await q.remove_all('a') == 3
+    assert await q.flattern() == ['b', 'c']
+    assert 'a' not in q and q.count('a') == 0
+
+    await q.remove('d')
+    assert len(q) == 2
+
+
+@async_test
+async def test_edits_without_await():
+    q = await AiterableDeque([1, 2, 3])
+    q.append(4)
+    q.appendleft(0)
+    assert len(q) == 5 and await q.flattern() == [0, 1, 2, 3, 4]
+    assert await q.pop() == 4 and await q.popleft() == 0
+
+    visited = []
+    async for value in q:
+        visited.append(value)
+        q.remove(value)  # current node is removed, iteration moves on
+        if value < 10:
+            q.append(value * 10)
+    assert visited == [1, 2, 3, 10, 20, 30]
+    assert len(q) == 0
+
+
+@async_test
+async def test_snapshot_and_chunked():
+    q = await AiterableDeque(range(10))
+    snapshot = q.snapshot()
+    assert snapshot is q.snapshot()  # copied once until next edit
+
+    q.remove(0)
+    assert snapshot == tuple(range(10))
+    assert q.snapshot() == tuple(range(1, 10))
+
+    switches = 0
+
+    async def count_switches():
+        nonlocal switches
+        while True:
+            await asyncio.sleep(0)
+            switches += 1
+
+    counter = loop.create_task(count_switches())
+    await asyncio.sleep(0)
+    values = [value async for value in q.chunked(4)]
+    counter.cancel()
+    assert values == list(range(1, 10))
+    assert switches == 2  # loop got control after 4th and 8th values
+
+
+@async_test
+async def test_extend_and_clear():
+    q = await AiterableDeque([3, 4], indexed=True)
+    await q.extend([5, 6])
+    q.extendleft([2, 1])
+    assert await q.flattern() == [1, 2, 3, 4, 5, 6]
+    assert await q[4] == 5 and 5 in q
+
+    visited = []
+    async for value in q:
+        visited.append(value)
+        if value == 2:
+            q.clear()
+    assert visited == [1, 2]
+    assert len(q) == 0 and 5 not in q and await q.flattern() == []
+
+    q.extend(range(3))
+    assert await q.flattern() == [0, 1, 2] and await q[-1] == 2
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from tests.test_asyncio_prepare import *
 
 
@@ -157,3 +159,527 @@ async def test_silent_getter():
 
     await getter.detach()
     pinger_task.cancel()
+
+
+@async_test
+async def test_callback_dispatch_options():
+    import threading
+
+    ch = await Channel(8)
+    sender = await ch.new_sender()
+    getter = await ch.new_getter(silent=True)
+    running = max_running = 0
+    handled, batches, threads = [], [], set()
+
+    async def slow(data):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        handled.append(data)
+
+    def in_thread(data):
+        threads.add(threading.get_ident())
+
+    with ThreadPoolExecutor(1) as executor:
+        getter.add_callback(slow, max_concurrency=2)
+        getter.add_callback(batches.append, batch=True)
+        getter.add_callback(in_thread, executor=executor)
+        await sender.send_many(range(50))
+        while len(handled) < 50:
+            await asyncio.sleep(0.01)
+
+    assert sorted(handled) == list(range(50)) and max_running == 2
+    assert [data for batch in batches for data in batch] == list(range(50)) and len(batches) < 50
+    assert threads and threading.get_ident() not in threads
+    await getter.detach()
+
+    with pytest.raises(ValueError):
+        getter.add_callback(slow, executor=executor)
+
+
+@async_test
+async def test_detach_cancels_pending_send():
+    ch = await Channel()
+    sender = await ch.new_sender()
+    await sender.send('ping')  # fills sender buffer, no getters awaiting
+
+    pending_send = loop.create_task(sender.send('ping'))
+    await asyncio.sleep(0)
+    assert not pending_send.done()
+
+    await sender.detach()
+    with pytest.raises(asyncio.CancelledError):
+        await pending_send
+    assert not sender.is_attached
+
+
+@async_test
+async def test_detach_cancels_pending_get():
+    ch = await Channel()
+    getter = await ch.new_getter()
+
+    pending_get = loop.create_task(getter.get())
+    await asyncio.sleep(0)
+    assert not pending_get.done()
+
+    await getter.detach()
+    with pytest.raises(asyncio.CancelledError):
+        await pending_get
+
+    sender = await ch.new_sender()
+    await getter.attach()
+    await sender.send('ping')
+    assert await getter.get() == 'ping'
+
+
+@async_test
+async def test_send_many_get_many():
+    ch = await Channel(4)
+    sender = await ch.new_sender()
+    getter_1 = await ch.new_getter()
+    getter_2 = await ch.new_getter()
+
+    send_task = loop.create_task(sender.send_many(range(20)))
+
+    received_1, received_2 = [], []
+    while len(received_1) < 20:
+        batch = await getter_1.get_many(8)
+        assert 0 < len(batch) <= 8
+        received_1.extend(batch)
+        received_2.extend(await getter_2.get_many(8))
+
+    await send_task
+    assert received_1 == list(range(20))
+    assert received_2 == list(range(20))
+
+
+@async_test
+async def test_get_many_timeout():
+    ch = await Channel()
+    getter = await ch.new_getter()
+
+    assert await getter.get_many(10, timeout=0.01) == []
+
+    sender = await ch.new_sender()
+    await sender.send_many(['ping'])
+    assert await getter.get_many(10, timeout=1) == ['ping']
+
+    with pytest.raises(ValueError):
+        await getter.get_many(0)
+
+
+async def lagging_getter_run(overflow):
+    ch = await Channel(2)
+    sender = await ch.new_sender()
+    getter = await ch.new_getter()
+    lagging_getter = await ch.new_getter(overflow=overflow)
+
+    send_task = loop.create_task(sender.send_many(range(5)))
+    for i in range(5):
+        assert await getter.get() == i  # lagging getter doesn't stall the channel
+    await send_task
+
+    return lagging_getter, [data async for data in lagging_getter]
+
+
+@async_test
+async def test_overflow_policies():
+    lagging_getter, received = await lagging_getter_run('drop_oldest')
+    assert received == [3, 4]
+    assert lagging_getter.dropped == 3
+
+    lagging_getter, received = await lagging_getter_run('drop_newest')
+    assert received == [0, 1]
+    assert lagging_getter.dropped == 3
+    assert lagging_getter.is_attached
+
+    lagging_getter, received = await lagging_getter_run('detach')
+    assert received == [0, 1]
+    assert lagging_getter.dropped > 0  # data sent after detach isn't counted
+    assert not lagging_getter.is_attached
+
+    ch = await Channel()
+    with pytest.raises(ValueError):
+        await ch.new_getter(overflow='unknown')
+
+
+@async_test
+async def test_ring_channel():
+    ch = await Channel(4, mode='ring')
+    sender = await ch.new_sender()
+    getters = [await ch.new_getter() for _ in range(3)]
+    lagging_getter = await ch.new_getter(overflow='drop_oldest')
+
+    send_task = loop.create_task(sender.send_many(range(20)))
+    for i in range(20):
+        for getter in getters:
+            assert await getter.get() == i
+    await send_task
+
+    assert len(ch._ring._slots) == 4  # data is stored once for all getters
+    assert [data async for data in lagging_getter] == [16, 17, 18, 19]
+    assert lagging_getter.dropped == 16
+
+    await getters[0].detach()
+    await sender.send('ping')
+    assert await getters[1].get() == 'ping'
+    await getters[0].attach()
+    await sender.send('pong')
+    assert await getters[0].get() == 'pong'
+
+    with pytest.raises(ValueError):
+        await ch.new_getter(overflow='drop_newest')
+    with pytest.raises(ValueError):
+        await Channel(0, mode='ring')
+    with pytest.raises(ValueError):
+        await Channel(mode='unknown')
+
+
+@async_test
+async def test_balance_channel_round_robin():
+    ch = await Channel(2, mode='balance')
+    sender = await ch.new_sender()
+    getters = [await ch.new_getter() for _ in range(3)]
+
+    send_task = loop.create_task(sender.send_many(range(30)))
+    received = [[] for _ in getters]
+    while sum(map(len, received)) < 30:
+        for getter, getter_received in zip(getters, received):
+            getter_received.extend(await getter.get_many(2, timeout=0.01))
+    await send_task
+
+    assert sorted(sum(received, [])) == list(range(30))  # every message is received once
+    assert all(getter_received for getter_received in received)
+
+    with pytest.raises(ValueError):
+        await ch.new_getter(overflow='drop_oldest')
+    with pytest.raises(ValueError):
+        await Channel(mode='balance', strategy='unknown')
+
+
+@async_test
+async def test_balance_channel_least_loaded():
+    ch = await Channel(4, mode='balance', strategy='least_loaded')
+    sender = await ch.new_sender()
+    getter_1 = await ch.new_getter()
+    getter_2 = await ch.new_getter()
+
+    get_task = loop.create_task(getter_1.get())
+    await sender.send_many('abcd')
+    assert await get_task == 'a'
+    assert await getter_2.get_many(4) == ['b', 'd']
+    assert await getter_1.get() == 'c'
+
+    await sender.send_many('ef')
+    assert await getter_1.get() == 'e'
+    assert await getter_2.get() == 'f'
+
+
+@async_test
+async def test_balance_channel_waits_for_getters():
+    ch = await Channel(mode='balance')
+    sender = await ch.new_sender()
+    await sender.send('job')
+
+    getter = await ch.new_getter()
+    assert await getter.get_many(1, timeout=1) == ['job']
+
+
+@async_test
+async def test_idle_channel_loop_sleeps():
+    ch = await Channel()
+    senders = [await ch.new_sender() for _ in range(100)]
+    getter = await ch.new_getter()
+
+    get_task = loop.create_task(getter.get())
+    await asyncio.sleep(0.01)
+    # getter awaits but nothing is sent, so channel loop should wait for wakeup instead of spinning
+    assert ch._wakeup_waiter is not None and not ch._wakeup_waiter.done()
+    assert not ch._ready_senders
+
+    await senders[50].send('ping')
+    assert await get_task == 'ping'
+    assert not ch._ready_senders
+
+    await senders[10].detach()
+    await senders[10].send('ping')  # detached sender is not handled by channel loop
+    assert not ch._ready_senders
+
+
+@async_test
+async def test_threadsafe_sender():
+    import threading
+
+    ch = await Channel(4)
+    getter = await ch.new_getter()
+    senders = [await ch.new_threadsafe_sender() for _ in range(2)]
+
+    threads = [
+        threading.Thread(target=senders[0].send_many, args=(range(100),)),
+        threading.Thread(target=lambda: [senders[1].send(i) for i in range(100, 200)]),
+    ]
+    for thread in threads:
+        thread.start()
+
+    received = [await getter.get() for _ in range(200)]
+    for thread in threads:
+        await loop.run_in_executor(None, thread.join)
+
+    assert [i for i in received if i < 100] == list(range(100))  # order is kept per sender
+    assert [i for i in received if i >= 100] == list(range(100, 200))
+
+    with pytest.raises(RuntimeError):
+        senders[0].send('ping')  # blocking send from loop thread
+
+
+@async_test
+async def test_threadsafe_sender_backpressure():
+    import threading
+
+    ch = await Channel(2)
+    sender = await ch.new_threadsafe_sender()
+
+    assert sender.try_send(1) and sender.try_send(2)
+    assert not sender.try_send(3)  # pending buffer is full
+    await asyncio.sleep(0)  # pending data is moved to sender buffer
+    assert len(sender.sender._send_queue) == 2
+    assert not sender.try_send(3)  # data in sender buffer counts too, no more than buffer size is in flight
+
+    thread = threading.Thread(target=sender.send, args=(3,))
+    thread.start()
+    await asyncio.sleep(0.01)
+    assert thread.is_alive()  # blocked until channel takes data
+
+    getter = await ch.new_getter()
+    assert [await getter.get() for _ in range(3)] == [1, 2, 3]
+    await loop.run_in_executor(None, thread.join)
+
+    await sender.detach()
+    with pytest.raises(ChannelError):
+        sender.try_send(4)
+
+
+@async_test
+async def test_bulk_endpoints():
+    ch = await Channel(4)
+    getters = await ch.new_getters(100)
+    senders = await ch.new_senders(3)
+    assert all(getter.is_attached for getter in getters)
+    assert all(sender.is_attached for sender in senders)
+
+    for i, sender in enumerate(senders):
+        await sender.send(i)
+    for getter in getters:
+        assert sorted([await getter.get() for _ in range(3)]) == [0, 1, 2]
+
+
+class _ScheduledSender:
+    def __init__(self, priority=0, weight=1):
+        self.priority, self.weight = priority, weight
+        self._taken = self._charged = 0
+        self._vstart = 0.0
+
+
+def _serve(scheduler, senders, turns):
+    for sender in senders:
+        scheduler.append(sender)
+    served = {sender: 0 for sender in senders}
+    for _ in range(turns):
+        sender = scheduler.popleft()
+        sender._taken += 1
+        served[sender] += 1
+        scheduler.append(sender)  # sender always has more data
+    return served
+
+
+@async_test
+async def test_sender_priority():
+    ch = await Channel(4)
+    bulk = await ch.new_sender()
+    urgent = await ch.new_sender(priority=1)
+    for i in range(4):
+        await bulk.send(f'bulk {i}')
+    for i in range(4):
+        await urgent.send(f'urgent {i}')
+
+    getter = await ch.new_getter()
+    received = [await getter.get() for _ in range(8)]
+    assert received == [f'urgent {i}' for i in range(4)] + [f'bulk {i}' for i in range(4)]
+
+    with pytest.raises(ValueError):
+        await ch.new_sender(weight=0)
+
+
+def test_sender_scheduler_weights():
+    light, heavy = _ScheduledSender(weight=1), _ScheduledSender(weight=3)
+    served = _serve(SenderScheduler(), [light, heavy], 400)
+    assert served[light] == 100 and served[heavy] == 300
+
+
+def test_sender_scheduler_starvation():
+    low, high = _ScheduledSender(), _ScheduledSender(priority=1)
+    scheduler = SenderScheduler(starvation_limit=10)
+    served = _serve(scheduler, [low, high], 110)
+    assert served[low] == 10
+
+    scheduler.remove(low)
+    with pytest.raises(ValueError):
+        scheduler.remove(low)
+    assert len(scheduler) == 1
+
+
+@async_test
+async def test_get_batch():
+    ch = await Channel(2)
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+
+    async def produce(count):
+        for i in range(count):
+            await sender.send(i)
+
+    # batch is bigger than getter buffer
+    loop.create_task(produce(10))
+    assert await getter.get_batch(10, 1) == list(range(10))
+
+    # batch is returned after max_wait
+    start = loop.time()
+    await sender.send('a')
+    loop.create_task(sender.send('b'))
+    assert await getter.get_batch(10, 0.05) == ['a', 'b']
+    assert loop.time() - start >= 0.05
+
+    # collected data is returned to getter if get_batch is cancelled
+    loop.create_task(produce(5))
+    task = loop.create_task(getter.get_batch(10, 1))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await getter.get_batch(3, 0) == [0, 1, 2]
+    assert await getter.get_many(10) == [3, 4]
+
+    with pytest.raises(ValueError):
+        await getter.get_batch(0, 1)
+
+
+@async_test
+async def test_batches():
+    ch = await Channel(8)
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+    await sender.send_many(range(7))
+
+    received = []
+    async for batch in getter.batches(3, 0.01):
+        received.append(batch)
+        if len(received) == 3:
+            break
+    assert received == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+@async_test
+async def test_conflate_channel():
+    ch = await Channel(4, mode='conflate', key=lambda data: data[0])
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+
+    for price in range(100):  # slow getter doesn't block sender
+        await sender.send(('a', price))
+        await sender.send(('b', price))
+    await sender.send(('c', 0))
+    await asyncio.sleep(0.01)
+
+    assert await getter.get_many(10) == [('a', 99), ('b', 99), ('c', 0)]
+    assert getter.dropped == 198
+
+    with pytest.raises(ValueError):
+        await ch.new_getter(overflow='drop_oldest')
+
+
+@async_test
+async def test_conflate_channel_latest_value():
+    ch = await Channel(mode='conflate')
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+    await sender.send_many(range(10))
+    await asyncio.sleep(0.01)
+    assert await getter.get() == 9
+
+
+@async_test
+async def test_conflate_channel_key_error():
+    errors = []
+    loop.set_exception_handler(lambda _, context: errors.append(context['exception']))
+    try:
+        ch = await Channel(mode='conflate', key=lambda data: data['id'])
+        getter = await ch.new_getter()
+        sender = await ch.new_sender()
+        await sender.send_many([{'id': 1}, {}, {'id': 2}])  # key fails for {}
+        await asyncio.sleep(0.01)
+        assert await getter.get_many(10) == [{'id': 1}, {'id': 2}]
+        assert len(errors) == 1 and getter.dropped == 1
+        assert not ch._run_channel_task.done()
+        ch.close()
+    finally:
+        loop.set_exception_handler(None)
+
+
+@async_test
+async def test_topic_getters():
+    ch = await Channel(16, key=lambda event: event['topic'])
+    everything = await ch.new_getter()
+    orders = await ch.new_getter(topics=['orders'])
+    users = await ch.new_getter(topics=('users', 'admins'))
+    big = await ch.new_getter(key=lambda event: event['size'] > 10)
+    sender = await ch.new_sender()
+
+    events = [{'topic': topic, 'size': size}
+              for topic, size in zip(['orders', 'users', 'logs', 'admins', 'orders'], [1, 20, 30, 2, 40])]
+    await sender.send_many(events)
+
+    assert await everything.get_many(10) == events
+    assert await orders.get_many(10) == [events[0], events[4]]
+    assert await users.get_many(10) == [events[1], events[3]]
+    assert await big.get_many(10) == [events[1], events[2], events[4]]
+
+    await orders.detach()
+    await sender.send({'topic': 'orders', 'size': 0})
+    assert await everything.get() == {'topic': 'orders', 'size': 0}
+    assert not orders._received_queue
+
+    with pytest.raises(ValueError):
+        await (await Channel()).new_getter(topics=['orders'])  # no key
+    with pytest.raises(ValueError):
+        await (await Channel(mode='ring')).new_getter(topics=['orders'], key=str)
+
+
+@async_test
+async def test_topic_getters_isolation():
+    errors = []
+    loop.set_exception_handler(lambda _, context: errors.append(context['exception']))
+    try:
+        ch = await Channel(2, key=lambda event: event['topic'])
+        orders = await ch.new_getter(topics=['orders'])
+        users = await ch.new_getter(topics=['users'])
+        orders_sender, users_sender = await ch.new_sender(), await ch.new_sender()
+
+        # orders getter is full after two messages, key fails for {}
+        send_task = loop.create_task(orders_sender.send_many([{'topic': 'orders'}] * 3))
+        await asyncio.sleep(0)
+        users_task = loop.create_task(users_sender.send_many([{'topic': 'users'}, {}, {'topic': 'users'}]))
+        received = []
+        while len(received) < 2:
+            received.extend(await asyncio.wait_for(users.get_many(10), 1))
+        assert received == [{'topic': 'users'}] * 2
+        assert await orders.get_many(10) == [{'topic': 'orders'}] * 2
+        assert await orders.get() == {'topic': 'orders'}
+        await send_task
+        await users_task
+        assert len(errors) == 1 and isinstance(errors[0], KeyError)
+        assert not ch._run_channel_task.done()
+        ch.close()
+    finally:
+        loop.set_exception_handler(None)
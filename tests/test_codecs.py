@@ -0,0 +1,110 @@
+import os
+import pickle
+import tempfile
+import tracemalloc
+
+from tests.test_asyncio_prepare import *
+from aiochannels.codecs import *
+from aiochannels.network import serve_channel, connect_sender, connect_getter
+
+MESSAGE = {'id': 1, 'price': 2.5, 'tags': ['a', 'b'], 'pair': (None, True), 'raw': b'\x00', 'big': 1 << 70}
+
+
+@pytest.mark.parametrize('codec', [PickleCodec(), CompactCodec(), SerializerCodec()])
+def test_codec_round_trip(codec):
+    assert codec.loads(codec.dumps(MESSAGE)) == MESSAGE
+    assert codec.decode(memoryview(b''.join(codec.encode('text')))) == 'text'
+
+
+@pytest.mark.skipif(not PICKLE_OOB, reason='pickle protocol 5 is required')
+def test_pickle_out_of_band():
+    data = bytearray(range(256)) * 16
+    segments = PickleCodec().encode(data)
+    assert any(isinstance(segment, memoryview) and segment.obj is data for segment in segments)
+
+    decoded = PickleCodec().loads(b''.join(segments))
+    assert decoded == data and type(decoded) is bytearray
+    assert PickleCodec().encode(bytearray(10)) == [pickle.dumps(bytearray(10), protocol=5)]  # small is in-band
+
+
+@pytest.mark.parametrize('codec', [PickleCodec(), CompactCodec(), SerializerCodec(), CodecRegistry()])
+def test_decode_copy(codec):
+    data = {'message': MESSAGE, 'buffer': bytearray(range(256)) * 16} if type(codec) is not CompactCodec else MESSAGE
+    payload = codec.dumps(data)
+    for cut in (1, len(payload) // 3, len(payload) - 2):  # payload split like it wraps around shared memory ring
+        segments = [memoryview(payload)[:cut], memoryview(payload)[cut:]]
+        assert codec.decode_copy(segments) == data
+    assert bytes(RawCodec().decode_copy([memoryview(b'ra'), memoryview(b'w')])) == b'raw'
+
+
+@pytest.mark.skipif(not PICKLE_OOB, reason='pickle protocol 5 is required')
+def test_decode_copy_copies_once():
+    data = bytearray(1 << 20)
+    payload = PickleCodec().dumps(data)
+    segments = [memoryview(payload)[:len(payload) // 2], memoryview(payload)[len(payload) // 2:]]
+    tracemalloc.start()
+    decoded = PickleCodec().decode_copy(segments)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert decoded == data and type(decoded) is bytearray
+    assert peak < 1.1 * len(data)  # buffer which spans segments is copied straight into decoded bytearray
+
+
+def test_codec_registry():
+    registry = CodecRegistry()
+    registry.register(bytes, RawCodec())
+    registry.register(bytearray, RawCodec())
+    registry.register(dict, CompactCodec())
+
+    payload = registry.dumps(b'raw')
+    assert payload == b'\x01raw'
+    assert bytes(registry.loads(payload)) == b'raw'
+    assert registry.loads(registry.dumps(MESSAGE)) == MESSAGE
+    assert registry.loads(registry.dumps({1, 2})) == {1, 2}  # default codec
+
+    with pytest.raises(TypeError):
+        CompactCodec().dumps({1, 2})
+
+
+@async_test
+async def test_network_codec():
+    path = os.path.join(tempfile.mkdtemp(), 'channel.sock')
+    ch = await Channel(4)
+    codec = CompactCodec()
+    server = await serve_channel(ch, path=path, serializer=codec)
+    sender = await connect_sender(path=path, serializer=codec)
+    getter = await connect_getter(path=path, serializer=codec)
+    local_getter = await ch.new_getter()
+    await asyncio.sleep(0.01)
+
+    await sender.send_many([MESSAGE, 'pong'])
+    assert await getter.get_many(2) == [MESSAGE, 'pong']
+    assert await local_getter.get_many(2) == [MESSAGE, 'pong']
+
+    await sender.detach()
+    await getter.detach()
+    server.close()
+
+
+@async_test
+async def test_shared_memory_codec():
+    shared_memory = pytest.importorskip('aiochannels.shared_memory')
+    ch = shared_memory.SharedMemoryChannel(1 << 16)
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+
+    data = bytearray(os.urandom(40000))
+    # buffer is copied into shared memory without pickling it, the second message wraps around the ring
+    send_task = loop.create_task(sender.send_many([data, data]))
+    assert await getter.get() == data
+    tracemalloc.start()
+    received = await getter.get()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert received == data and peak < 1.1 * len(data)  # wrapped message is copied once too
+    await send_task
+
+    await sender.detach()
+    await getter.detach()
+    ch.close()
+    ch.unlink()
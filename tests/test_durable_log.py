@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+from tests.test_asyncio_prepare import *
+from aiochannels import DurableLog
+
+
+@async_test
+async def test_log_replay():
+    with tempfile.TemporaryDirectory() as path:
+        log = DurableLog(path, segment_size=256, fsync_interval=0.01)
+        ch = await Channel(4, log=log)
+        sender = await ch.new_sender()
+        await sender.send_many(range(50))  # channel without getters writes data into log
+        await asyncio.sleep(0.01)
+        assert log.end_offset == 50
+
+        late = await ch.new_getter(offset=45)
+        assert [await late.get() for _ in range(5)] == list(range(45, 50))
+        everything = await ch.new_getter(offset=0)
+        received = [await everything.get() for _ in range(20)]
+
+        async def get(getter, count):
+            return [await getter.get() for _ in range(count)]
+
+        loop.create_task(sender.send_many(range(50, 60)))  # replaying getter doesn't lose new data
+        rest, late_received = await asyncio.gather(get(everything, 40), get(late, 10))
+        assert received + rest == list(range(60))
+        assert late_received == list(range(50, 60))
+        log.close()  # waits for writer thread
+        assert len(os.listdir(path)) > 1
+
+        # log is recovered from files, incomplete record is dropped
+        with open(os.path.join(path, sorted(os.listdir(path))[-1]), 'ab') as f:
+            f.write(b'\x00\x00\x01')
+        log = DurableLog(path)
+        assert log.end_offset == 60
+        assert log.read(10, 3) == [10, 11, 12]
+        ch = await Channel(4, log=log)
+        getter = await ch.new_getter(offset=58, topics=[59], key=lambda data: data)
+        assert await getter.get() == 59
+        log.close()
+
+    with pytest.raises(ValueError):
+        await (await Channel()).new_getter(offset=0)
+
+
+@async_test
+async def test_log_writer_thread():
+    with tempfile.TemporaryDirectory() as path:
+        log = DurableLog(path, segment_size=64, fsync_interval=0)
+        for i in range(0, 30, 3):
+            log.append([i, i + 1, i + 2])
+        # records are readable while writer thread may still be writing them
+        assert log.read(0, 100) == list(range(30))
+        assert log.read(25, 3) == [25, 26, 27]
+        log.close()
+
+        log = DurableLog(path)
+        assert log.end_offset == 30 and log.read(0, 100) == list(range(30))
+        log.close()
+
+
+@async_test
+async def test_balance_log_waits_for_getters():
+    with tempfile.TemporaryDirectory() as path:
+        log = DurableLog(path)
+        ch = await Channel(2, mode='balance', log=log)
+        sender = await ch.new_sender()
+
+        await sender.send_many([1, 2])
+        with pytest.raises(asyncio.TimeoutError):  # balance channel doesn't take data without getters
+            await asyncio.wait_for(sender.send(3), 0.01)
+        assert log.end_offset == 0
+
+        getter = await ch.new_getter()
+        assert await getter.get_many(2) == [1, 2]
+        assert log.end_offset == 2 and log.read(0, 10) == [1, 2]
+        ch.close()
+        log.close()
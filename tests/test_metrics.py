@@ -0,0 +1,115 @@
+from tests.test_asyncio_prepare import *
+from aiochannels.metrics import *
+from aiochannels.selector import select
+
+
+@async_test
+async def test_stats_without_metrics():
+    ch = await Channel(4)
+    sender = await ch.new_sender()
+    getter = await ch.new_getter()
+    assert type(sender) is Channel.Sender and type(getter) is Channel.Getter
+
+    await sender.send_many(range(3))
+    await getter.get()
+    await asyncio.sleep(0.01)
+
+    stats = ch.stats()
+    assert stats['senders'] == 1 and stats['getters'] == 1
+    assert stats['getter_queue_depth'] == 2
+    assert 'sent' not in stats
+    assert getter.stats() == {'queue_depth': 2, 'dropped': 0}
+
+
+@async_test
+async def test_metrics():
+    exported = []
+    metrics = Metrics(sizer=len, latency_sample=1, exporter=exported.append, export_interval=0.01)
+    ch = await Channel(2, metrics=metrics)
+    sender = await ch.new_sender()
+    getter_1, getter_2 = await ch.new_getters(2)
+
+    async def get_all(getter):
+        return [await getter.get() for _ in range(10)]
+
+    get_tasks = [loop.create_task(get_all(getter)) for getter in (getter_1, getter_2)]
+    await sender.send_many([b'data'] * 6)
+    for _ in range(4):
+        await sender.send(b'x')
+    await asyncio.gather(*get_tasks)
+    await asyncio.sleep(0.02)
+
+    stats = ch.stats()
+    assert stats['sent'] == 10 and stats['received'] == 20
+    assert stats['sent_bytes'] == 28 and stats['received_bytes'] == 56
+    assert stats['loop_iterations'] > 0 and stats['delivered_batches'] > 0
+    assert stats['send_blocked_time'] > 0
+    assert sum(stats['latency_histogram'].values()) > 0
+    assert 0 < stats['latency_p50'] <= stats['latency_p99']
+
+    assert sender.stats()['sent'] == 10 and getter_1.stats()['received'] == 10
+    assert exported and exported[-1]['sent'] == 10
+
+    with pytest.raises(ValueError):
+        await Channel(metrics=metrics)
+    ch.close()
+
+
+@async_test
+async def test_latency_of_repeated_data():
+    ch = await Channel(8, metrics=Metrics(latency_sample=1))
+    getters = [await ch.new_getter(), await ch.new_getter()]
+    sender = await ch.new_sender()
+
+    for _ in range(5):
+        await sender.send('same')  # samples aren't told apart by data
+    await asyncio.sleep(0.02)
+    for getter in getters:
+        assert await getter.get_many(5) == ['same'] * 5
+
+    stats = ch.stats()
+    assert sum(stats['latency_histogram'].values()) == 10  # every getter measures every message
+    assert stats['latency_p50'] >= 0.02
+    ch.close()
+
+
+@async_test
+async def test_latency_of_cancelled_send():
+    metrics = Metrics(latency_sample=1)
+    ch = await Channel(1, metrics=metrics)
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+
+    await sender.send('a')  # waits in full sender buffer until getter demands it
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(sender.send('b'), 0.01)
+    assert await getter.get() == 'a'
+    metrics.latency_buckets.clear()
+
+    await asyncio.sleep(0.2)
+    getting = loop.create_task(getter.get())
+    await sender.send('c')  # cancelled 'b' isn't sampled, so 'c' doesn't get its time
+    assert await getting == 'c'
+    assert sum(metrics.latency_buckets.values()) == 1 and ch.stats()['latency_p99'] < 0.1
+    ch.close()
+
+
+@async_test
+async def test_latency_of_select_and_threadsafe_sends():
+    ch = await Channel(4, metrics=Metrics(latency_sample=1))
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+    threadsafe_sender = await ch.new_threadsafe_sender()
+    getting = loop.create_task(getter.get_many(1))
+
+    await select((sender, 'a'))
+    assert await getting == ['a']
+    for send in (sender.send, lambda data: loop.run_in_executor(None, threadsafe_sender.send, data)):
+        await asyncio.sleep(0.1)
+        getting = loop.create_task(getter.get_many(1))
+        await send('b')
+        assert await getting == ['b']
+
+    stats = ch.stats()
+    assert sum(stats['latency_histogram'].values()) == 3 and stats['latency_p99'] < 0.1
+    ch.close()
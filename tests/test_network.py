@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import subprocess
+
+from tests.test_asyncio_prepare import *
+import pickle
+
+from aiochannels.network import *
+
+
+@async_test
+async def test_remote_endpoints():
+    path = os.path.join(tempfile.mkdtemp(), 'channel.sock')
+    ch = await Channel(4)
+    server = await serve_channel(ch, path=path)
+
+    getter_1 = await connect_getter(path=path)
+    getter_2 = await connect_getter(path=path)
+    sender = await connect_sender(path=path)
+    await asyncio.sleep(0.01)  # let broker attach endpoints
+
+    await sender.send({'ping': 1})
+    assert await getter_1.get() == {'ping': 1}
+    assert await getter_2.get() == {'ping': 1}
+
+    send_task = loop.create_task(sender.send_many(range(100)))
+    received_1, received_2 = [], []
+    while len(received_1) < 100 or len(received_2) < 100:
+        received_1.extend(await getter_1.get_many(10, timeout=0.01))
+        received_2.extend(await getter_2.get_many(10, timeout=0.01))
+    await send_task
+    assert received_1 == received_2 == list(range(100))
+
+    await sender.detach()
+    await getter_1.detach()
+    await getter_2.detach()
+    server.close()
+
+
+@async_test
+async def test_remote_sender_credits():
+    path = os.path.join(tempfile.mkdtemp(), 'channel.sock')
+    ch = await Channel(2)
+    server = await serve_channel(ch, path=path)
+    local_getter = await ch.new_getter()
+    sender = await connect_sender(path=path)
+
+    send_task = loop.create_task(sender.send_many(range(20)))
+    await asyncio.sleep(0.05)
+    assert not send_task.done()  # no credits until channel takes data
+
+    received = []
+    while len(received) < 20:
+        # channel messages are serialized payloads when broker has no serializer
+        received.extend(pickle.loads(data) for data in await local_getter.get_many(20))
+    await send_task
+    assert received == list(range(20))
+
+    await sender.detach()
+    server.close()
+
+
+@async_test
+async def test_broker_process():
+    path = os.path.join(tempfile.mkdtemp(), 'channel.sock')
+    broker = subprocess.Popen([sys.executable, '-m', 'aiochannels.network', '--unix', path, '--buffer-size', '8'],
+                              stdout=subprocess.PIPE)
+    try:
+        assert await loop.run_in_executor(None, broker.stdout.readline) == b'Broker is ready\n'
+        getter = await connect_getter(path=path)
+        sender = await connect_sender(path=path)
+        await asyncio.sleep(0.05)
+
+        await sender.send_many(['ping', 'pong'])
+        assert await getter.get() == 'ping'
+        assert await getter.get() == 'pong'
+
+        await sender.detach()
+        await getter.detach()
+    finally:
+        broker.terminate()
+        broker.wait()
+
+
+def _start_broker(path):
+    broker = subprocess.Popen([sys.executable, '-m', 'aiochannels.network', '--unix', path, '--buffer-size', '1'],
+                              stdout=subprocess.PIPE)
+    assert broker.stdout.readline() == b'Broker is ready\n'
+    return broker
+
+
+@async_test
+async def test_broker_disconnect():
+    getter_path = os.path.join(tempfile.mkdtemp(), 'channel.sock')
+    sender_path = os.path.join(tempfile.mkdtemp(), 'channel.sock')
+    brokers = [_start_broker(getter_path), _start_broker(sender_path)]
+    try:
+        getter = await connect_getter(path=getter_path)
+        get_task = loop.create_task(getter.get())  # nothing is sent
+        sender = await connect_sender(path=sender_path)
+        send_task = loop.create_task(sender.send_many(range(10)))  # no getters, so it waits for credits
+        await asyncio.sleep(0.05)
+        assert not get_task.done() and not send_task.done()
+    finally:
+        for broker in brokers:
+            broker.terminate()
+            broker.wait()
+
+    for task in (get_task, send_task):
+        with pytest.raises(ChannelError):
+            await task
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.test_asyncio_prepare import *
+from aiochannels import pipeline
+
+
+async def _collect(stage, count):
+    getter = await stage.channel.new_getter()
+    return [await getter.get() for _ in range(count)]
+
+
+@async_test
+async def test_pipeline_stages():
+    source = await Channel(8)
+    numbers = await pipeline.flat_map(source, range)
+    odd = await pipeline.filter(numbers, lambda x: x % 2)
+    squares = await pipeline.map(odd, lambda x: x * x)
+    batches = await pipeline.batch(squares, 3, 0.05)
+    collecting = loop.create_task(_collect(batches, 2))
+
+    sender = await source.new_sender()
+    await sender.send(7)  # 0..6 -> 1, 3, 5 -> 1, 9, 25
+    await sender.send(4)  # 0..3 -> 1, 3 -> 1, 9
+    assert await collecting == [[1, 9, 25], [1, 9]]
+
+    for stage in (batches, squares, odd, numbers):
+        await stage.close()
+
+
+@async_test
+async def test_pipeline_concurrency():
+    in_flight = max_in_flight = 0
+
+    async def slow_double(x):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep((x % 3) / 1000)  # later data can be ready earlier
+        in_flight -= 1
+        return x * 2
+
+    source = await Channel(16)
+    ordered = await pipeline.map(source, slow_double, concurrency=4)
+    unordered = await pipeline.map(source, slow_double, concurrency=4, ordered=False)
+    collecting = loop.create_task(_collect(ordered, 20))
+    collecting_unordered = loop.create_task(_collect(unordered, 20))
+
+    sender = await source.new_sender()
+    await sender.send_many(range(20))
+    assert await collecting == [x * 2 for x in range(20)]
+    assert sorted(await collecting_unordered) == [x * 2 for x in range(20)]
+    assert max_in_flight <= 8
+
+    await ordered.close()
+    await unordered.close()
+
+
+@async_test
+async def test_pipeline_executor_and_merge():
+    with ThreadPoolExecutor(2) as executor:
+        first, second = await Channel(4), await Channel(4)
+        merged = await pipeline.merge(first, second)
+        lengths = await pipeline.map(merged, len, executor=executor, concurrency=2)
+        collecting = loop.create_task(_collect(lengths, 4))
+
+        await (await first.new_sender()).send_many(['a', 'bb'])
+        await (await second.new_sender()).send_many(['ccc', 'dddd'])
+        assert sorted(await collecting) == [1, 2, 3, 4]
+
+        await lengths.close()
+        await merged.close()
+
+    with pytest.raises(ValueError):
+        await pipeline.map(first, len, concurrency=0)
+
+
+@async_test
+async def test_pipeline_flat_map_errors():
+    def explode(x):
+        for i in range(x):
+            if i == 2:
+                raise RuntimeError('Partway')
+            yield i
+
+    def items(x):
+        return None if x == 1 else explode(x)  # None is not iterable
+
+    errors = []
+    loop.set_exception_handler(lambda _, context: errors.append(context['exception']))
+    try:
+        source = await Channel(8)
+        stage = await pipeline.flat_map(source, items)
+        ordered_stage = await pipeline.flat_map(source, items, concurrency=2)
+        collecting = loop.create_task(_collect(stage, 3))
+        collecting_ordered = loop.create_task(_collect(ordered_stage, 3))
+
+        await (await source.new_sender()).send_many([1, 5, 2, 1])  # only 2 -> 0, 1 is delivered
+        await (await source.new_sender()).send(1)
+        await (await source.new_sender()).send(2)
+        assert await collecting == [0, 1, 0]
+        assert await collecting_ordered == [0, 1, 0]
+        assert len(errors) == 8
+
+        await stage.close()
+        await ordered_stage.close()
+    finally:
+        loop.set_exception_handler(None)
+
+
+@async_test
+async def test_pipeline_merge_unlimited():
+    errors = []
+    loop.set_exception_handler(lambda _, context: errors.append(context['exception']))
+    try:
+        first, second = await Channel(0), await Channel(0)
+        merged = await pipeline.merge(first, second)
+        assert merged.channel.buffer_size == 0
+        collecting = loop.create_task(_collect(merged, 4))
+
+        await (await first.new_sender()).send_many([1, 2])
+        await (await second.new_sender()).send_many([3, 4])
+        assert sorted(await collecting) == [1, 2, 3, 4]
+
+        async def fail():
+            raise RuntimeError('Worker bug')
+
+        merged._start(fail())  # stopped worker is reported
+        await asyncio.sleep(0.01)
+        assert len(errors) == 1 and isinstance(errors[0], RuntimeError)
+
+        await merged.close()
+        assert len(errors) == 1
+    finally:
+        loop.set_exception_handler(None)
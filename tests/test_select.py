@@ -0,0 +1,89 @@
+from tests.test_asyncio_prepare import *
+from aiochannels.selector import *
+
+
+@async_test
+async def test_select_getters():
+    ch_1 = await Channel()
+    ch_2 = await Channel()
+    sender_1 = await ch_1.new_sender()
+    sender_2 = await ch_2.new_sender()
+    getter_1 = await ch_1.new_getter()
+    getter_2 = await ch_2.new_getter()
+
+    select_task = loop.create_task(select(getter_1, getter_2))
+    await asyncio.sleep(0)
+    await sender_2.send('pong')
+    assert await select_task == (getter_2, 'pong')
+
+    await sender_1.send('ping')
+    assert await select(getter_1, getter_2) == (getter_1, 'ping')
+
+    # select registers no waiters after completion
+    assert not getter_1._waiters and not getter_2._waiters
+
+
+@async_test
+async def test_select_sender_and_getter():
+    ch = await Channel()
+    sender = await ch.new_sender()
+    getter = await ch.new_getter()
+
+    assert await select(getter, (sender, 'ping')) == (sender, 'ping')
+    # sender is full until channel moves 'ping' to getter, then both cases are ready
+    assert await select((sender, 'pong'), getter) == (sender, 'pong')
+    assert await select(getter, (sender, 'pang')) == (getter, 'ping')
+
+
+@async_test
+async def test_select_default_and_timeout():
+    ch = await Channel()
+    getter = await ch.new_getter()
+    sender = await ch.new_sender()
+
+    assert await select(getter, default='nothing') == (None, 'nothing')
+    with pytest.raises(asyncio.TimeoutError):
+        await select(getter, timeout=0.01)
+    assert not getter._waiters
+
+    await sender.send('ping')
+    assert await select(getter, timeout=1) == (getter, 'ping')
+
+    with pytest.raises(TypeError):
+        await select(sender)
+
+
+@async_test
+async def test_select_completes_one_case():
+    ch = await Channel(2)
+    sender = await ch.new_sender()
+    getter_1 = await ch.new_getter()
+    getter_2 = await ch.new_getter()
+
+    await sender.send_many(['ping', 'pong'])
+    await getter_1.get()
+    # both getters are ready but only first one receives
+    assert await select(getter_2, getter_1) == (getter_2, 'ping')
+    assert await getter_2.get() == 'pong'
+    assert await getter_1.get() == 'pong'
+
+
+@async_test
+async def test_select_endpoint_detached():
+    ch_1 = await Channel()
+    ch_2 = await Channel()
+    getter_1 = await ch_1.new_getter()
+    getter_2 = await ch_2.new_getter()
+
+    select_task = loop.create_task(select(getter_1, getter_2))
+    await asyncio.sleep(0)
+    await getter_1.detach()
+    with pytest.raises(ChannelError):  # not CancelledError, select task wasn't cancelled
+        await select_task
+    assert not getter_2._waiters
+
+    select_task = loop.create_task(select(getter_2))
+    await asyncio.sleep(0)
+    select_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await select_task
@@ -0,0 +1,71 @@
+import multiprocessing
+
+from tests.test_asyncio_prepare import *
+
+shared_memory = pytest.importorskip('aiochannels.shared_memory')
+SharedMemoryChannel = shared_memory.SharedMemoryChannel
+
+
+def remote_sender(ch, messages):
+    async def send():
+        sender = await ch.new_sender()
+        await sender.send_many(range(messages // 2))
+        for i in range(messages // 2, messages):
+            await sender.send(i)
+        await sender.detach()
+
+    asyncio.new_event_loop().run_until_complete(send())
+    ch.close()
+
+
+@async_test
+async def test_shared_memory_channel():
+    ch = SharedMemoryChannel(1024)
+    getter_1 = await ch.new_getter()
+    getter_2 = await ch.new_getter()
+    sender = await ch.new_sender()
+
+    await sender.send({'ping': 1})
+    await (sender << 'pong')
+    assert await getter_1.get() == {'ping': 1}
+    assert await getter_1.get() == 'pong'
+    assert [data async for data in getter_2] == [{'ping': 1}, 'pong']
+
+    assert await getter_1.get_many(10, timeout=0.01) == []
+    await getter_2.detach()
+
+    # small buffer makes sender wait for getter
+    send_task = loop.create_task(sender.send_many(range(500)))
+    received = []
+    while len(received) < 500:
+        received.extend(await getter_1.get_many(100))
+    await send_task
+    assert received == list(range(500))
+
+    with pytest.raises(ValueError):
+        await sender.send(b'0' * 2048)
+
+    await sender.detach()
+    await getter_1.detach()
+    ch.close()
+    ch.unlink()
+
+
+@async_test
+async def test_shared_memory_channel_processes():
+    ch = SharedMemoryChannel(4096)
+    getter = await ch.new_getter()
+
+    process = multiprocessing.Process(target=remote_sender, args=(ch, 1000))
+    process.start()
+    received = []
+    while len(received) < 1000:
+        received.extend(await getter.get_many(100, timeout=5))
+    await loop.run_in_executor(None, process.join)
+
+    assert received == list(range(1000))
+    assert process.exitcode == 0
+
+    await getter.detach()
+    ch.close()
+    ch.unlink()